@@ -1,8 +1,13 @@
 # analytics.py
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 from models import HostStats
 import statistics
 
+try:
+    import numpy as np
+except ImportError:  # analyze_fleet falls back to analyze_host per host
+    np = None
+
 
 def compute_basic_stats(st: HostStats) -> Dict:
     """
@@ -33,7 +38,8 @@ def compute_basic_stats(st: HostStats) -> Dict:
 
 def longest_loss_streak(st: HostStats) -> int:
     """
-    Return the longest number of consecutive failed responses.
+    Return the longest number of consecutive failed responses in the current
+    window.  st.outages.longest tracks the same over the whole run.
     """
     longest = 0
     current = 0
@@ -48,6 +54,12 @@ def longest_loss_streak(st: HostStats) -> int:
     return longest
 
 
+def _voip(st: HostStats) -> Dict:
+    """Jitter and MOS are kept incrementally by HostStats; just read them."""
+    jitter, r_factor, score = st.voip()
+    return {"jitter_ms": jitter, "r_factor": r_factor, "mos": score}
+
+
 def analyze_host(st: HostStats) -> Dict:
     """
     Master analysis entry point.
@@ -59,4 +71,84 @@ def analyze_host(st: HostStats) -> Dict:
     return {
         **basic,
         "longest_loss_streak": loss_streak,
+        "longest_loss_streak_run": st.outages.longest,
+        "outages": len(st.outages.events),
+        **_voip(st),
     }
+
+
+def _pack(hosts: List[HostStats]):
+    """
+    Stack every host's window into (hosts x samples) arrays, padded to the
+    longest window: latency (NaN = no reply or padding), lost flag, span.
+    """
+    width = max((len(st.samples) for st in hosts), default=0)
+    lat = np.full((len(hosts), width), np.nan)
+    lost = np.zeros((len(hosts), width), dtype=bool)
+    span = np.zeros((len(hosts), width), dtype=np.uint32)
+    for row, st in enumerate(hosts):
+        ring = st.samples
+        n = len(ring)
+        if not n:
+            continue
+        lat[row, :n] = np.frombuffer(ring.latencies(), dtype=np.float64)
+        ok = np.unpackbits(np.frombuffer(ring.ok_bitmap(), dtype=np.uint8), count=n, bitorder="little")
+        lost[row, :n] = ok == 0
+        span[row, :n] = np.frombuffer(ring.spans(), dtype=np.uint32)
+    return lat, lost, span
+
+
+def _longest_runs(flags):
+    """Longest run of True per row."""
+    if not flags.shape[1]:
+        return np.zeros(flags.shape[0], dtype=np.int64)
+    run = np.cumsum(flags, axis=1)
+    # Subtract the running count as of the last False, which restarts each streak
+    base = np.maximum.accumulate(np.where(flags, 0, run), axis=1)
+    return (run - base).max(axis=1)
+
+
+def analyze_fleet(stats: Iterable[HostStats]) -> Dict[str, Dict]:
+    """
+    analyze_host for many hosts at once, keyed by host, plus "loss_pct" as
+    in HostStats.counts().  With numpy the whole fleet is packed into 2-D
+    arrays and reduced column-wise; results match the per-host functions
+    (up to float rounding in mean/stdev).
+    """
+    hosts = list(stats)
+    if np is None:
+        return {st.host: {**analyze_host(st), "loss_pct": st.counts()[2]} for st in hosts}
+    lat, lost, span = _pack(hosts)
+    have = ~np.isnan(lat)
+    n = have.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(lat, axis=1) / n
+        stdev = np.sqrt(np.nansum((lat - mean[:, None]) ** 2, axis=1) / n)
+        above_1 = (lat > (mean + stdev)[:, None]).sum(axis=1)
+        above_2 = (lat > (mean + 2 * stdev)[:, None]).sum(axis=1)
+    covered = span.sum(axis=1, dtype=np.int64)
+    lost_span = np.where(lost, span, 0).sum(axis=1, dtype=np.int64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        loss_pct = np.where(covered > 0, lost_span / covered * 100.0, 100.0)
+    streak = _longest_runs(lost)
+
+    out: Dict[str, Dict] = {}
+    for row, st in enumerate(hosts):
+        if n[row]:
+            basic = {
+                "mean": float(mean[row]),
+                "stdev": float(stdev[row]),
+                "above_1sigma": int(above_1[row]),
+                "above_2sigma": int(above_2[row]),
+            }
+        else:
+            basic = {"mean": None, "stdev": None, "above_1sigma": 0, "above_2sigma": 0}
+        out[st.host] = {
+            **basic,
+            "longest_loss_streak": int(streak[row]),
+            "longest_loss_streak_run": st.outages.longest,
+            "outages": len(st.outages.events),
+            "loss_pct": round(float(loss_pct[row]), 1),
+            **_voip(st),
+        }
+    return out
@@ -1,15 +1,46 @@
 
-import queue
+import os
 from settings import Settings
+from transport import SampleBuffer
+from history import HistoryWriter
+import rollup
 from ui import MultiPingApp
 from ping_worker import HostManager
+from async_worker import AsyncHostManager
+from sharded import ShardedHostManager
 
 def main():
-    sample_queue = queue.Queue()
+    sample_queue = SampleBuffer()
     settings = Settings.load()
-    host_manager = HostManager(sample_queue=sample_queue)
-    app = MultiPingApp(settings=settings, host_manager=host_manager, sample_queue=sample_queue)
+    rollup.configure(settings.rollup_hours)
+    history = None
+    if settings.history_path():
+        # Every drained batch is also written to the history database, off the UI thread
+        history = HistoryWriter(settings.history_path())
+        sample_queue.listeners.append(history.submit)
+    if settings.manager == "asyncio":
+        host_manager = AsyncHostManager(
+            sample_queue=sample_queue, engine=settings.engine,
+            max_pps=settings.max_pps, max_in_flight=settings.max_in_flight,
+            backoff_after=settings.backoff_after, backoff_max_s=settings.backoff_max_s,
+        )
+    elif settings.manager == "processes":
+        host_manager = ShardedHostManager(
+            sample_queue=sample_queue, engine=settings.engine,
+            shards=settings.shards or os.cpu_count() or 2, pool_size=settings.pool_size,
+            max_pps=settings.max_pps, max_in_flight=settings.max_in_flight,
+            backoff_after=settings.backoff_after, backoff_max_s=settings.backoff_max_s,
+        )
+    else:
+        host_manager = HostManager(
+            sample_queue=sample_queue, engine=settings.engine, pool_size=settings.pool_size,
+            max_pps=settings.max_pps, max_in_flight=settings.max_in_flight,
+            backoff_after=settings.backoff_after, backoff_max_s=settings.backoff_max_s,
+        )
+    app = MultiPingApp(settings=settings, host_manager=host_manager, sample_queue=sample_queue, history=history)
     app.mainloop()
+    if history is not None:
+        history.stop()
 
 if __name__ == "__main__":
     main()
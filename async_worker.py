@@ -0,0 +1,184 @@
+import asyncio, socket, threading, time
+from contextlib import nullcontext
+import concurrent.futures as cf
+from typing import Dict, Optional, List, Tuple
+from queue import Queue
+from models import PingSample
+from utils import ping_command, parse_ping_output, FAILURE
+import icmp
+from dns_cache import DNS_CACHE
+from ratelimit import make_limiter, make_backoff, phase_offsets
+
+
+class AsyncIcmpProber:
+    """
+    Non-blocking ICMP prober for one event loop.
+    One socket per address family is shared by every host; the loop watches it
+    with add_reader and hands each echo reply to the waiter keyed by (ip, seq).
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._socks: Dict[int, icmp.IcmpSocket] = {}
+        self._waiters: Dict[Tuple[str, int], asyncio.Future] = {}
+
+    def _sock(self, family: int) -> icmp.IcmpSocket:
+        s = self._socks.get(family)
+        if s is None:
+            s = self._socks[family] = icmp.IcmpSocket(family)
+            self.loop.add_reader(s.fileno(), self._on_readable, s)
+        return s
+
+    def _on_readable(self, s: icmp.IcmpSocket):
+        while True:
+            try:
+                got = s.recv()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            if got is None:
+                continue
+            src, seq, ttl, recv_ns = got
+            fut = self._waiters.pop((src, seq), None)
+            if fut is not None and not fut.done():
+                fut.set_result((recv_ns, ttl))
+
+    async def ping(self, host: str, timeout_ms: int) -> Dict:
+        target = icmp.parse_literal(host)
+        if target is None:
+            try:
+                info = await self.loop.getaddrinfo(host, None, type=socket.SOCK_RAW)
+            except (socket.gaierror, UnicodeError, OSError):
+                return dict(FAILURE)
+            target = icmp.pick_address(info)
+        if target is None:
+            return dict(FAILURE)
+        family, ip = target
+        try:
+            s = self._sock(family)
+            seq = s.next_seq()
+            fut = self.loop.create_future()
+            self._waiters[(ip, seq)] = fut
+            sent = s.send(ip, seq)
+        except OSError:
+            self._waiters.pop((ip, seq), None)
+            return dict(FAILURE)
+        try:
+            recv_ns, ttl = await asyncio.wait_for(fut, timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            return dict(FAILURE)
+        finally:
+            self._waiters.pop((ip, seq), None)
+        return {"success": True, "latency_ms": round((recv_ns - sent) / 1e6, 3), "ip": ip, "ttl": ttl}
+
+    def close(self):
+        for s in self._socks.values():
+            self.loop.remove_reader(s.fileno())
+            s.close()
+        self._socks.clear()
+
+
+def _kill(proc):
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass
+
+
+async def ping_subprocess(host: str, timeout_ms: int) -> Dict:
+    """Run the system ping without blocking the loop (still one process per sample)."""
+    try:
+        proc = await asyncio.create_subprocess_exec(*ping_command(host, timeout_ms), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+    except OSError:
+        return dict(FAILURE)
+    try:
+        out, _ = await asyncio.wait_for(proc.communicate(), timeout_ms / 1000 + 2)
+    except asyncio.TimeoutError:
+        _kill(proc); await proc.wait()
+        return dict(FAILURE)
+    except asyncio.CancelledError:
+        _kill(proc)
+        raise
+    return parse_ping_output(out.decode(errors="replace"))
+
+
+class AsyncHostManager:
+    """
+    Drop-in alternative to ping_worker.HostManager that runs every host as a
+    coroutine on one asyncio loop (in a single background thread) instead of
+    one OS thread per host.  Samples go into the same thread-safe sample_queue.
+    """
+
+    def __init__(self, sample_queue: Queue, engine: str = "subprocess", max_pps: float = 0.0, max_in_flight: int = 0, backoff_after: int = 0, backoff_max_s: float = 30.0):
+        self.sample_queue = sample_queue; self.engine = engine
+        self.backoff_after = backoff_after; self.backoff_max_s = backoff_max_s
+        self.limiter = make_limiter(max_pps, max_in_flight)
+        self.tasks: Dict[str, cf.Future] = {}
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="zestyping-async", daemon=True)
+        self._thread.start()
+        self._prober: Optional[AsyncIcmpProber] = None
+        if engine == "icmp" and icmp.available():
+            self._prober = AsyncIcmpProber(self.loop)
+
+    async def _probe(self, host: str, timeout_ms: int) -> Dict:
+        hit, ip = DNS_CACHE.cached(host)
+        if not hit:
+            ip = await self.loop.run_in_executor(None, DNS_CACHE.resolve, host)
+        if ip is None:
+            return dict(FAILURE)
+        async with (self.limiter.aslot() if self.limiter is not None else nullcontext()):
+            if self._prober is not None:
+                res = await self._prober.ping(ip, timeout_ms)
+            else:
+                res = await ping_subprocess(ip, timeout_ms)
+        res["ip"] = res.get("ip") or ip
+        return res
+
+    async def _run_host(self, host: str, interval_s: float, timeout_ms: int, max_count: Optional[int], start_delay: float = 0.0):
+        if start_delay > 0:
+            await asyncio.sleep(start_delay)
+        seq = 0; next_tick = self.loop.time()
+        backoff = make_backoff(interval_s, self.backoff_after, self.backoff_max_s); span = 1; ticks = 0
+        while max_count is None or ticks < max_count:
+            res = await self._probe(host, timeout_ms)
+            self.sample_queue.put(PingSample(ts=time.time(), host=host, success=res["success"], latency_ms=res.get("latency_ms"), ip=res.get("ip"), ttl=res.get("ttl"), seq=seq, span=span))
+            seq += 1; ticks += span
+            if backoff is not None:
+                span = backoff.update(res["success"])
+            next_tick += interval_s * span
+            await asyncio.sleep(max(0, next_tick - self.loop.time()))
+
+    def start_host(self, host: str, interval_s: float, timeout_ms: int, max_count: Optional[int] = None, start_delay: float = 0.0):
+        if host in self.tasks: return
+        self.tasks[host] = asyncio.run_coroutine_threadsafe(self._run_host(host, interval_s, timeout_ms, max_count, start_delay), self.loop)
+
+    def start_hosts(self, hosts: List[str], interval_s: float, timeout_ms: int, max_count: Optional[int] = None):
+        """Start many hosts with first probes spread evenly across one interval."""
+        for h, delay in zip(hosts, phase_offsets(len(hosts), interval_s)):
+            self.start_host(h, interval_s, timeout_ms, max_count, start_delay=delay)
+
+    def start_sweep(self, hosts: List[str], interval_s: float, timeout_ms: int, max_count: Optional[int] = None):
+        """All hosts already share one socket and loop here, so a sweep is just a phase-spread start."""
+        self.start_hosts(hosts, interval_s, timeout_ms, max_count)
+
+    def _stop(self, hosts: List[str]):
+        futs = [self.tasks.pop(h) for h in hosts if h in self.tasks]
+        for f in futs: f.cancel()
+        if futs: cf.wait(futs, timeout=1.5)
+
+    def stop_host(self, host: str):
+        self._stop([host])
+
+    def stop_all(self):
+        self._stop(list(self.tasks.keys()))
+
+    def cleanup_finished(self) -> List[str]:
+        dead = [h for h, f in self.tasks.items() if f.done()]
+        for h in dead: self.tasks.pop(h, None)
+        return dead
+
+    def running_hosts(self): return [h for h, f in self.tasks.items() if not f.done()]
+
+    def limiter_stats(self) -> Optional[Dict]: return self.limiter.stats() if self.limiter is not None else None
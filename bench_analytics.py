@@ -0,0 +1,51 @@
+# bench_analytics.py
+"""
+Compare analytics.analyze_host (one host at a time) with analytics.analyze_fleet
+(all hosts vectorized) on synthetic windows, and check they agree.
+
+    python bench_analytics.py [hosts ...]      # default: 1000 10000
+"""
+import math, random, sys, time
+from analytics import analyze_fleet, analyze_host
+from models import HostStats, PingSample
+
+WINDOW = 60
+
+
+def make_fleet(n_hosts: int, window: int = WINDOW, seed: int = 1):
+    rnd = random.Random(seed)
+    fleet = []
+    for i in range(n_hosts):
+        st = HostStats(host=f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", count=window)
+        base = rnd.uniform(1, 80); loss = rnd.choice((0.0, 0.01, 0.1, 0.5))
+        for k in range(window):
+            ok = rnd.random() >= loss
+            st.add(PingSample(ts=k, host=st.host, success=ok, latency_ms=round(rnd.gauss(base, base / 10), 3) if ok else None, seq=k))
+        fleet.append(st)
+    return fleet
+
+
+def _same(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def bench(n_hosts: int):
+    fleet = make_fleet(n_hosts)
+    t0 = time.perf_counter()
+    per_host = {st.host: {**analyze_host(st), "loss_pct": st.counts()[2]} for st in fleet}
+    t1 = time.perf_counter()
+    vectorized = analyze_fleet(fleet)
+    t2 = time.perf_counter()
+    mismatches = sum(
+        1 for h, ref in per_host.items()
+        if not all(_same(ref[k], vectorized[h][k]) if isinstance(ref[k], float) else ref[k] == vectorized[h][k] for k in ref)
+    )
+    print(f"{n_hosts:>6} hosts x {WINDOW}: per-host {t1 - t0:7.3f} s   fleet {t2 - t1:7.3f} s   "
+          f"speedup {(t1 - t0) / (t2 - t1):5.1f}x   mismatches {mismatches}")
+
+
+if __name__ == "__main__":
+    for n in [int(a) for a in sys.argv[1:]] or [1000, 10000]:
+        bench(n)
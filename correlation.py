@@ -0,0 +1,123 @@
+# correlation.py
+"""
+Correlated-outage detection across hosts.
+
+Hosts are indexed into groups, by address prefix (/24 for IPv4, /64 for IPv6)
+and by description (the group label a CSV import gives every host of a row).
+Each host owns one bit inside each of its groups.  Samples are folded into
+time buckets as per-group bitsets of hosts that lost a probe and hosts that
+answered; when a bucket closes, popcount(lost & ~answered) says how many
+members were down in it, with no pairwise comparison between hosts.  A group
+crossing the threshold yields one event ("10.1.4.0/24: 212/254 hosts down at
+02:13:05") and stays quiet until it drops back below.
+"""
+import ipaddress, time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+BUCKET_S = 5.0        # minimum bucket width; at least one probe interval
+MIN_DOWN = 3          # hosts down in a bucket before a group event is raised
+MIN_FRACTION = 0.5    # ...and at least this share of the group's members
+V4_PREFIX = 24
+V6_PREFIX = 64
+
+
+@dataclass(slots=True)
+class CorrelatedEvent:
+    ts: float          # start of the bucket
+    group: str
+    down: int
+    members: int
+
+    def message(self) -> str:
+        clock = time.strftime("%H:%M:%S", time.localtime(self.ts))
+        return f"{self.down}/{self.members} hosts down at {clock}"
+
+    def __str__(self) -> str:
+        return f"{self.group}: {self.message()}"
+
+
+class _Group:
+    __slots__ = ("label", "members", "buckets", "active")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.members = 0
+        self.buckets: Dict[int, List[int]] = {}  # bucket -> [lost bits, answered bits]
+        self.active = False
+
+
+def prefix_of(ip: Optional[str]) -> Optional[str]:
+    """'10.1.4.0/24' for an IPv4 address, its /64 for IPv6, None for anything else."""
+    try:
+        addr = ipaddress.ip_address(ip) if ip else None
+    except ValueError:
+        return None
+    if addr is None:
+        return None
+    bits = V4_PREFIX if addr.version == 4 else V6_PREFIX
+    return str(ipaddress.ip_network(f"{addr}/{bits}", strict=False))
+
+
+class OutageCorrelator:
+    def __init__(self, bucket_s: float = BUCKET_S, min_down: int = MIN_DOWN, min_fraction: float = MIN_FRACTION):
+        self.bucket_s = max(float(bucket_s), 0.001)
+        self.min_down = min_down; self.min_fraction = min_fraction
+        self._groups: Dict[str, _Group] = {}
+        self._index: Dict[str, List[Tuple[_Group, int]]] = {}  # host -> (group, bit) pairs
+
+    def _join(self, key: str, label: str) -> Tuple[_Group, int]:
+        g = self._groups.get(key)
+        if g is None:
+            g = self._groups[key] = _Group(label)
+        bit = g.members; g.members += 1
+        return g, bit
+
+    def register(self, host: str, ip: Optional[str] = None, description: str = ""):
+        """Index host under its prefix and description groups (idempotent)."""
+        if host in self._index:
+            return
+        prefix = prefix_of(ip or host)
+        if prefix is None and ip is None:
+            return  # a name that has not resolved yet; index it on a later sample
+        slots = []
+        if prefix:
+            slots.append(self._join("net:" + prefix, prefix))
+        if description:
+            slots.append(self._join("desc:" + description, f'"{description}"'))
+        self._index[host] = slots
+
+    def add(self, host: str, ts: float, success: bool):
+        slots = self._index.get(host)
+        if not slots:
+            return
+        b = int(ts // self.bucket_s)
+        for g, bit in slots:
+            cell = g.buckets.get(b)
+            if cell is None:
+                cell = g.buckets[b] = [0, 0]
+            cell[1 if success else 0] |= 1 << bit
+
+    def poll(self, now: Optional[float] = None) -> List[CorrelatedEvent]:
+        """
+        Close every bucket that ended more than one bucket ago (late samples
+        still land) and return the correlated events they produced.
+        """
+        now = time.time() if now is None else now
+        horizon = int(now // self.bucket_s) - 1
+        events: List[CorrelatedEvent] = []
+        for g in self._groups.values():
+            for b in sorted(k for k in g.buckets if k < horizon):
+                lost, answered = g.buckets.pop(b)
+                down = (lost & ~answered).bit_count()
+                if down >= self.min_down and down >= self.min_fraction * g.members:
+                    if not g.active:
+                        events.append(CorrelatedEvent(b * self.bucket_s, g.label, down, g.members))
+                    g.active = True
+                else:
+                    g.active = False
+        events.sort(key=lambda e: e.ts)
+        return events
+
+    def clear(self):
+        self._groups.clear(); self._index.clear()
@@ -0,0 +1,124 @@
+# detectors.py
+"""
+Streaming change detection per host.
+
+ShiftDetector keeps an EWMA baseline of latency (mean and variance) and runs a
+two-sided CUSUM on the standardized residuals, so a sustained move of two
+standard deviations or more is flagged within a few samples while isolated
+spikes are absorbed.  After a shift the baseline is relearned from scratch.
+Loss bursts use a one-sided CUSUM on the loss indicator against the host's own
+EWMA loss rate: the sum carries across replies, so sustained intermittent loss
+(e.g. three in four) alerts too, while a normally lossy link does not keep firing.
+Everything is O(1) per sample.
+
+Alerts go to an AlertLog (ALERTS by default): a bounded history in `events`,
+a `pending` queue the UI drains on its timer, and optional listeners.
+"""
+import logging, math
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional
+
+log = logging.getLogger("zestyping.alerts")
+
+BASELINE_ALPHA = 0.05   # EWMA weight of the latency baseline
+FAST_ALPHA = 0.3        # EWMA weight of recent latency, reported as the new level
+CUSUM_K = 1.0           # slack per sample, in standard deviations
+CUSUM_H = 8.0           # alarm threshold, in standard deviations
+Z_CLIP = 4.0            # cap per-sample residual so isolated spikes cannot alarm alone
+WARMUP = 20             # replies used to (re)learn the baseline before alerts are allowed
+MIN_SIGMA_MS = 0.5      # floor on the baseline stdev, so very stable hosts are not hair-triggered
+LOSS_ALPHA = 0.02       # EWMA weight of the baseline loss rate
+LOSS_K = 0.2            # slack per sample above the baseline loss rate
+LOSS_H = 4.0            # about five straight losses on a clean link
+
+
+@dataclass(slots=True)
+class Alert:
+    ts: float
+    host: str
+    kind: str      # "latency_up", "latency_down", "loss_burst" or "correlated_outage"
+    message: str
+    value: float   # new latency level in ms, baseline loss % for loss bursts, hosts down for correlated outages
+
+
+class AlertLog:
+    def __init__(self, maxlen: int = 500):
+        self.events: Deque[Alert] = deque(maxlen=maxlen)
+        self.pending: Deque[Alert] = deque(maxlen=maxlen)
+        self.listeners: List[Callable[[Alert], None]] = []
+
+    def post(self, alert: Alert):
+        self.events.append(alert); self.pending.append(alert)
+        log.info("%s: %s", alert.host, alert.message)
+        for fn in list(self.listeners):
+            fn(alert)
+
+    def drain(self) -> List[Alert]:
+        """Alerts posted since the last drain, oldest first."""
+        out = list(self.pending)
+        self.pending.clear()
+        return out
+
+
+# One log per process; HostStats posts here.
+ALERTS = AlertLog()
+
+
+class ShiftDetector:
+    __slots__ = ("host", "n", "mean", "var", "fast", "hi", "lo", "loss_rate", "loss_sum", "in_burst")
+
+    def __init__(self, host: str):
+        self.host = host
+        self.clear()
+
+    def clear(self):
+        self.n = 0; self.mean = 0.0; self.var = 0.0; self.fast = 0.0
+        self.hi = 0.0; self.lo = 0.0
+        self.loss_rate = 0.0; self.loss_sum = 0.0; self.in_burst = False
+
+    def add(self, ts: float, success: bool, lat: Optional[float]) -> Optional[Alert]:
+        """Feed one sample; return an Alert if it completes a shift or loss burst."""
+        alert = self._loss(ts, not success)
+        if lat is not None:
+            alert = self._latency(ts, lat) or alert
+        return alert
+
+    def _loss(self, ts: float, lost: bool) -> Optional[Alert]:
+        x = 1.0 if lost else 0.0
+        # Replies only drain the sum by loss_rate + k, so intermittent loss still accumulates
+        self.loss_sum = max(0.0, self.loss_sum + x - self.loss_rate - LOSS_K)
+        alert = None
+        if self.loss_sum > LOSS_H and not self.in_burst:
+            self.in_burst = True
+            alert = Alert(ts, self.host, "loss_burst", f"loss burst (baseline loss {self.loss_rate * 100:.1f}%)", round(self.loss_rate * 100, 1))
+        elif self.loss_sum == 0.0:
+            self.in_burst = False  # re-armed once the burst has fully drained
+        self.loss_rate += LOSS_ALPHA * (x - self.loss_rate)
+        return alert
+
+    def _latency(self, ts: float, lat: float) -> Optional[Alert]:
+        self.n += 1
+        if self.n == 1:
+            self.mean = self.fast = lat
+            return None
+        self.fast += FAST_ALPHA * (lat - self.fast)
+        d = lat - self.mean
+        if self.n > WARMUP:
+            sigma = max(math.sqrt(self.var), MIN_SIGMA_MS, 0.05 * self.mean)
+            z = max(-Z_CLIP, min(Z_CLIP, d / sigma))
+            d = z * sigma  # clipped, so spikes cannot inflate the baseline either
+            self.hi = max(0.0, self.hi + z - CUSUM_K)
+            self.lo = max(0.0, self.lo - z - CUSUM_K)
+            if self.hi > CUSUM_H or self.lo > CUSUM_H:
+                up = self.hi > CUSUM_H
+                alert = Alert(ts, self.host, "latency_up" if up else "latency_down",
+                              f"latency shifted {'up' if up else 'down'}: {self.mean:.1f} -> {self.fast:.1f} ms", round(self.fast, 1))
+                # Relearn the baseline at the new level so a sustained shift alerts once
+                self.n = 1; self.mean = self.fast; self.var = 0.0; self.hi = self.lo = 0.0
+                return alert
+        # Plain running mean while (re)learning, then an EWMA
+        alpha = max(BASELINE_ALPHA, 1.0 / self.n)
+        self.mean += alpha * d
+        self.var = (1 - alpha) * (self.var + alpha * d * d)
+        return None
@@ -0,0 +1,111 @@
+# dns_cache.py
+"""
+Shared name-resolution cache for all ping workers.
+
+Hosts are resolved once and then probed by IP, so neither the system ping nor
+the ICMP engine hits the resolver on every sample.  The stdlib resolver does
+not expose record TTLs, so entries live for a fixed positive / negative TTL;
+once an answer is past REFRESH_FRACTION of its TTL it is still served while a
+background thread re-resolves it.  Address changes are logged and kept in
+`events` so the UI can show them.
+"""
+import logging, socket, threading, time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import icmp
+from utils import FAILURE
+
+log = logging.getLogger("zestyping.dns")
+
+POSITIVE_TTL_S = 300.0
+NEGATIVE_TTL_S = 30.0
+REFRESH_FRACTION = 0.8
+
+
+class DnsCache:
+    def __init__(self, ttl_s: float = POSITIVE_TTL_S, negative_ttl_s: float = NEGATIVE_TTL_S):
+        self.ttl_s = ttl_s; self.negative_ttl_s = negative_ttl_s
+        self._entries: Dict[str, Tuple[Optional[str], float, float]] = {}  # host -> (ip, refresh_at, expires_at)
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self._wake = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self.events: Deque[Tuple[float, str, Optional[str], Optional[str]]] = deque(maxlen=256)
+        self.listeners: List[Callable[[str, Optional[str], Optional[str]], None]] = []
+
+    def _lookup(self, host: str) -> Optional[str]:
+        try:
+            info = socket.getaddrinfo(host, None, 0, socket.SOCK_RAW)
+        except (socket.gaierror, UnicodeError, OSError):
+            return None
+        target = icmp.pick_address(info)
+        return target[1] if target else None
+
+    def _store(self, host: str, ip: Optional[str]):
+        now = time.monotonic(); ttl = self.ttl_s if ip else self.negative_ttl_s
+        with self._lock:
+            old = self._entries.get(host)
+            self._entries[host] = (ip, now + ttl * REFRESH_FRACTION, now + ttl)
+        if old is not None and old[0] != ip:
+            self.events.append((time.time(), host, old[0], ip))
+            log.info("%s now resolves to %s (was %s)", host, ip or "nothing", old[0] or "nothing")
+            for fn in list(self.listeners):
+                fn(host, old[0], ip)
+
+    def cached(self, host: str) -> Tuple[bool, Optional[str]]:
+        """
+        Non-blocking lookup.  Returns (hit, ip); ip is None on a negative hit.
+        Schedules a background refresh for entries that are getting old.
+        """
+        if icmp.parse_literal(host) is not None:
+            return True, host
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None or now >= entry[2]:
+                return False, None
+            if now >= entry[1] and host not in self._refreshing:
+                self._refreshing.add(host); self._ensure_thread(); self._wake.notify()
+            return True, entry[0]
+
+    def resolve(self, host: str) -> Optional[str]:
+        """Cached address for host, resolving in the calling thread on a miss."""
+        hit, ip = self.cached(host)
+        if hit:
+            return ip
+        ip = self._lookup(host)
+        self._store(host, ip)
+        return ip
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, name="zestyping-dns", daemon=True)
+            self._thread.start()
+
+    def _refresh_loop(self):
+        while True:
+            with self._lock:
+                while not self._refreshing:
+                    self._wake.wait()
+                host = next(iter(self._refreshing))
+            try:
+                self._store(host, self._lookup(host))
+            finally:
+                with self._lock:
+                    self._refreshing.discard(host)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# One cache per process, shared by every worker and manager.
+DNS_CACHE = DnsCache()
+
+
+def ping_resolved(ping: Callable[..., Dict], host: str, timeout_ms: int) -> Dict:
+    """Probe host's cached address with ping(ip, timeout_ms=...); result ip falls back to the resolved one."""
+    ip = DNS_CACHE.resolve(host)
+    res = ping(ip, timeout_ms=timeout_ms) if ip else dict(FAILURE)
+    res["ip"] = res.get("ip") or ip
+    return res
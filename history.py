@@ -0,0 +1,367 @@
+# history.py
+"""
+Time-series history of every sample in a local SQLite database (WAL mode).
+
+Raw samples are indexed by (host, ts); every sample is kept, including two
+with the same timestamp (the stream engine's gap-fill losses).  Alongside
+them, each batch updates three rollup tables (1 min, 1 h and 1 day buckets)
+holding sent, recv, latency count / min / max / sum / sum of squares and a
+LatencySketch per bucket, so a range query reads a few pre-aggregated rows per
+host instead of scanning raw samples: the range is covered by whole days, then
+whole hours, then minutes at the ragged ends (minute resolution, UTC-aligned
+buckets).  "Loss% per host for 02:00-03:00" is one indexed SUM over the hour
+table; "top 20 hosts by p95 this week" merges about seven day sketches per
+host.
+
+HistoryWriter takes batches off the sample transport (a SampleBuffer listener)
+and writes them on its own thread, one transaction per batch.  Rollup rows of
+buckets still being filled are cached in memory, so each bucket is read back
+once when it opens (a restarted writer or a late sample may have stored part
+of it already), not on every batch.  `sent` and `recv` count configured
+intervals (span-weighted), as in HostStats.counts().
+"""
+import math, sqlite3, threading, time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+from sketch import LatencySketch, PERCENTILES
+
+# (table, bucket width in seconds), finest first
+TIERS: Tuple[Tuple[str, int], ...] = (("rollup_1m", 60), ("rollup_1h", 3600), ("rollup_1d", 86400))
+RAW_KEEP_S = 7 * 86400        # raw samples kept this long by prune()
+MINUTE_KEEP_S = 31 * 86400    # 1 min rollups kept this long; hour and day rollups are kept
+MAX_PENDING = 200_000         # samples queued for the writer before the oldest batches are dropped
+SCHEMA_VERSION = 1            # 1: samples became a rowid table so equal (host, ts) pairs are all kept
+
+_ROLLUP = """
+CREATE TABLE IF NOT EXISTS {t} (
+    host_id INTEGER NOT NULL,
+    bucket  INTEGER NOT NULL,
+    sent    INTEGER NOT NULL,
+    recv    INTEGER NOT NULL,
+    n       INTEGER NOT NULL,
+    lat_min REAL,
+    lat_max REAL,
+    lat_sum REAL NOT NULL,
+    lat_sq  REAL NOT NULL,
+    sketch  BLOB NOT NULL,
+    PRIMARY KEY (host_id, bucket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS {t}_bucket ON {t}(bucket);
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    id   INTEGER PRIMARY KEY,
+    host TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS samples (
+    id         INTEGER PRIMARY KEY,
+    host_id    INTEGER NOT NULL,
+    ts         REAL NOT NULL,
+    success    INTEGER NOT NULL,
+    latency_ms REAL,
+    span       INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS samples_host_ts ON samples(host_id, ts);
+""" + "".join(_ROLLUP.format(t=t) for t, _ in TIERS)
+
+
+class _Agg:
+    """One rollup bucket while it is being filled."""
+    __slots__ = ("sent", "recv", "n", "min", "max", "sum", "sq", "sketch")
+
+    def __init__(self):
+        self.sent = self.recv = self.n = 0
+        self.min = self.max = None
+        self.sum = self.sq = 0.0
+        self.sketch = LatencySketch()
+
+    @classmethod
+    def from_row(cls, row) -> "_Agg":
+        a = cls.__new__(cls)
+        a.sent, a.recv, a.n, a.min, a.max, a.sum, a.sq, blob = row
+        a.sketch = LatencySketch.from_bytes(blob)
+        return a
+
+    def add(self, success: bool, lat: Optional[float], span: int):
+        self.sent += span
+        if success:
+            self.recv += span
+        if lat is not None:
+            self.n += 1; self.sum += lat; self.sq += lat * lat
+            self.min = lat if self.min is None else min(self.min, lat)
+            self.max = lat if self.max is None else max(self.max, lat)
+            self.sketch.add(lat)
+
+
+def cover(t0: float, t1: float) -> List[Tuple[str, int, int]]:
+    """
+    (table, first bucket, end bucket) pieces covering [t0, t1) at minute
+    resolution with the coarsest buckets that fit entirely inside it.
+    """
+    pieces: List[Tuple[str, int, int]] = []
+
+    def split(a: int, b: int, level: int):
+        if a >= b:
+            return
+        table, w = TIERS[level]
+        if level == 0:
+            pieces.append((table, a, b)); return
+        lo, hi = -(-a // w) * w, b // w * w
+        if lo >= hi:
+            split(a, b, level - 1); return
+        split(a, lo, level - 1)
+        pieces.append((table, lo, hi))
+        split(hi, b, level - 1)
+
+    w0 = TIERS[0][1]
+    split(math.floor(t0 / w0) * w0, math.ceil(t1 / w0) * w0, len(TIERS) - 1)
+    return pieces
+
+
+class History:
+    """One connection; use one History per thread (WAL lets readers run beside the writer)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; a power cut may lose the last commits
+        self._migrate()
+        self._ids: Dict[str, int] = dict(self._db.execute("SELECT host, id FROM hosts"))
+        self._open: Dict[Tuple[int, int, int], _Agg] = {}  # (tier, host_id, bucket) -> bucket being filled
+
+    def close(self):
+        self._db.close()
+
+    def _migrate(self):
+        db = self._db
+        if db.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            db.executescript(SCHEMA)
+            return
+        # Version 0 keyed samples by (host_id, ts) WITHOUT ROWID; copy them into the rowid table
+        old = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'samples'").fetchone()
+        with db:
+            if old:
+                db.execute("ALTER TABLE samples RENAME TO samples_v0")
+        db.executescript(SCHEMA)
+        with db:
+            if old:
+                db.execute("INSERT INTO samples (host_id, ts, success, latency_ms, span) "
+                           "SELECT host_id, ts, success, latency_ms, span FROM samples_v0 ORDER BY ts")
+                db.execute("DROP TABLE samples_v0")
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _host_id(self, host: str) -> int:
+        i = self._ids.get(host)
+        if i is None:
+            i = self._ids[host] = self._db.execute("INSERT INTO hosts (host) VALUES (?)", (host,)).lastrowid
+        return i
+
+    def _agg(self, tier: int, hid: int, bucket: int) -> _Agg:
+        key = (tier, hid, bucket)
+        a = self._open.get(key)
+        if a is None:
+            # New bucket, or a late sample for one already flushed: carry on from what is stored
+            row = self._db.execute(
+                f"SELECT sent, recv, n, lat_min, lat_max, lat_sum, lat_sq, sketch FROM {TIERS[tier][0]} "
+                "WHERE host_id = ? AND bucket = ?", (hid, bucket)).fetchone()
+            a = self._open[key] = _Agg.from_row(row) if row else _Agg()
+        return a
+
+    def add_batch(self, samples: Iterable) -> int:
+        """Insert PingSamples and update the rollups, all in one transaction."""
+        rows = []; touched = set()
+        try:
+            self._write(samples, rows, touched)
+        except Exception:
+            self._open.clear()  # the cache may hold rolled-back counts; re-read from disk
+            raise
+        self._evict()
+        return len(rows)
+
+    def _write(self, samples: Iterable, rows: list, touched: set):
+        with self._db:
+            for s in samples:
+                hid = self._host_id(s.host)
+                ok = bool(s.success)
+                lat = float(s.latency_ms) if ok and s.latency_ms is not None else None
+                rows.append((hid, s.ts, int(ok), lat, s.span))
+                for tier, (_, w) in enumerate(TIERS):
+                    b = int(s.ts // w) * w
+                    self._agg(tier, hid, b).add(ok, lat, s.span)
+                    touched.add((tier, hid, b))
+            self._db.executemany(
+                "INSERT INTO samples (host_id, ts, success, latency_ms, span) VALUES (?, ?, ?, ?, ?)", rows)
+            for tier, (table, _) in enumerate(TIERS):
+                self._db.executemany(
+                    f"INSERT OR REPLACE INTO {table} (host_id, bucket, sent, recv, n, lat_min, lat_max, lat_sum, lat_sq, sketch) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((hid, b, a.sent, a.recv, a.n, a.min, a.max, a.sum, a.sq, a.sketch.to_bytes())
+                     for (t, hid, b), a in ((k, self._open[k]) for k in touched if k[0] == tier)))
+
+    def _evict(self, now: Optional[float] = None):
+        # Drop cached buckets that ended over a minute ago; a late sample re-reads them
+        now = time.time() if now is None else now
+        for key in [k for k in self._open if k[2] + TIERS[k[0]][1] < now - 60]:
+            del self._open[key]
+
+    def prune(self, now: Optional[float] = None, raw_keep_s: float = RAW_KEEP_S, minute_keep_s: float = MINUTE_KEEP_S):
+        now = time.time() if now is None else now
+        with self._db:
+            # Per host, so each delete is a range on the (host_id, ts) index rather than a table scan
+            self._db.executemany("DELETE FROM samples WHERE host_id = ? AND ts < ?",
+                                 ((hid, now - raw_keep_s) for (hid,) in self._db.execute("SELECT id FROM hosts").fetchall()))
+            self._db.execute(f"DELETE FROM {TIERS[0][0]} WHERE bucket < ?", (now - minute_keep_s,))
+
+    # ---------- queries ----------
+
+    def hosts(self) -> List[str]:
+        return [h for (h,) in self._db.execute("SELECT host FROM hosts ORDER BY id")]
+
+    def _reload_ids(self):
+        # Another connection (the writer) may have added hosts since this one opened
+        self._ids = dict(self._db.execute("SELECT host, id FROM hosts"))
+
+    def _ids_for(self, hosts: Optional[Sequence[str]]) -> Optional[List[int]]:
+        self._reload_ids()
+        return None if hosts is None else [self._ids[h] for h in hosts if h in self._ids]
+
+    def _rollup_rows(self, t0: float, t1: float, cols: str, hosts: Optional[Sequence[str]] = None):
+        ids = self._ids_for(hosts)
+        parts, args = [], []
+        for table, b0, b1 in cover(t0, t1):
+            sql = f"SELECT host_id, {cols} FROM {table} WHERE bucket >= ? AND bucket < ?"
+            args += [b0, b1]
+            if ids is not None:
+                sql += f" AND host_id IN ({','.join('?' * len(ids))})"; args += ids
+            parts.append(sql)
+        return " UNION ALL ".join(parts), args
+
+    def loss_by_host(self, t0: float, t1: float, hosts: Optional[Sequence[str]] = None) -> Dict[str, Tuple[int, int, float]]:
+        """host -> (sent, recv, loss_pct) over [t0, t1)."""
+        sub, args = self._rollup_rows(t0, t1, "sent, recv", hosts)
+        out = {}
+        for host, sent, recv in self._db.execute(
+                f"SELECT h.host, SUM(r.sent), SUM(r.recv) FROM ({sub}) r JOIN hosts h ON h.id = r.host_id "
+                "GROUP BY r.host_id ORDER BY h.id", args):
+            out[host] = (sent, recv, round((sent - recv) * 100.0 / sent, 1) if sent else 100.0)
+        return out
+
+    def sketches(self, t0: float, t1: float, hosts: Optional[Sequence[str]] = None) -> Dict[str, LatencySketch]:
+        """host -> latency sketch merged over [t0, t1)."""
+        sub, args = self._rollup_rows(t0, t1, "sketch", hosts)
+        names = {i: h for h, i in self._ids.items()}
+        out: Dict[str, LatencySketch] = {}
+        for hid, blob in self._db.execute(sub, args):
+            host = names[hid]
+            sk = out.get(host)
+            if sk is None:
+                out[host] = LatencySketch.from_bytes(blob)
+            else:
+                sk.merge(LatencySketch.from_bytes(blob))
+        return out
+
+    def top_by_percentile(self, t0: float, t1: float, q: float = 0.95, limit: int = 20) -> List[Tuple[str, float]]:
+        """The `limit` hosts with the highest latency at quantile q over [t0, t1), highest first."""
+        ranked = [(h, sk.quantile(q)) for h, sk in self.sketches(t0, t1).items() if sk.n]
+        ranked.sort(key=lambda r: r[1], reverse=True)
+        return ranked[:limit]
+
+    def summary(self, host: str, t0: float, t1: float) -> Optional[Dict]:
+        """Loss% and latency min/avg/max/stdev/percentiles of one host over [t0, t1), as Rollups.summary()."""
+        sub, args = self._rollup_rows(t0, t1, "sent, recv, n, lat_min, lat_max, lat_sum, lat_sq", [host])
+        row = self._db.execute(
+            f"SELECT SUM(sent), SUM(recv), SUM(n), MIN(lat_min), MAX(lat_max), SUM(lat_sum), SUM(lat_sq) FROM ({sub})", args).fetchone()
+        sent, recv, n, mn, mx, total, sq = row
+        if not sent:
+            return None
+        avg = total / n if n else None
+        sk = self.sketches(t0, t1, [host]).get(host) or LatencySketch()
+        return {
+            "sent": sent, "recv": recv, "loss_pct": round((sent - recv) * 100.0 / sent, 1),
+            "min": mn, "avg": avg, "max": mx,
+            "stdev": math.sqrt(max(sq / n - avg * avg, 0.0)) if n else None,
+            **{f"p{round(q * 100)}": v for q, v in zip(PERCENTILES, sk.quantiles(PERCENTILES))},
+        }
+
+    def samples(self, host: str, t0: float, t1: float) -> List[Tuple[float, bool, Optional[float], int]]:
+        """Raw (ts, success, latency_ms, span) of one host in [t0, t1), by primary key range."""
+        self._reload_ids()
+        hid = self._ids.get(host)
+        if hid is None:
+            return []
+        return [(ts, bool(ok), lat, span) for ts, ok, lat, span in self._db.execute(
+            "SELECT ts, success, latency_ms, span FROM samples WHERE host_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (hid, t0, t1))]
+
+
+class HistoryWriter:
+    """Background thread writing batches handed over by the sample transport."""
+
+    def __init__(self, path: str, max_pending: int = MAX_PENDING):
+        self.path = path
+        self.max_pending = max_pending
+        self._batches: Deque[list] = deque()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._run, name="zestyping-history", daemon=True)
+        self._thread.start()
+
+    def submit(self, batch: Iterable):
+        """Queue a batch (called from SampleBuffer.drain); never blocks on the database."""
+        batch = list(batch)
+        if not batch:
+            return
+        with self._lock:
+            self._batches.append(batch); self._pending += len(batch)
+            while self._pending > self.max_pending and len(self._batches) > 1:
+                old = self._batches.popleft()
+                self._pending -= len(old); self.dropped += len(old)
+        self._wake.set()
+
+    def _take(self) -> list:
+        with self._lock:
+            batches, self._batches = self._batches, deque()
+            self._pending = 0
+        return [s for b in batches for s in b]
+
+    def _run(self):
+        try:
+            hist = History(self.path)
+        except Exception as e:
+            self.error = e
+            return
+        last_prune = 0.0
+        try:
+            while True:
+                self._wake.wait(1.0); self._wake.clear()
+                batch = self._take()
+                if batch:
+                    try:
+                        self.written += hist.add_batch(batch)
+                    except sqlite3.Error as e:
+                        self.error = e; self.dropped += len(batch)
+                if time.time() - last_prune > 3600:
+                    last_prune = time.time()
+                    try:
+                        hist.prune()
+                    except sqlite3.Error as e:
+                        self.error = e
+                if self._stop.is_set() and not self._batches:
+                    break
+        finally:
+            hist.close()
+
+    def stop(self, timeout: float = 5.0):
+        """Write what is queued, then end the thread."""
+        self._stop.set(); self._wake.set()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        return {"written": self.written, "dropped": self.dropped, "pending": self._pending}
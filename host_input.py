@@ -1,62 +1,181 @@
-
 import re, ipaddress
+from itertools import islice
+from typing import Iterator, Optional, Tuple
+from intervals import IntervalSet
 
 RE_LAST_OCT_RANGE = re.compile(r'^(\d+\.\d+\.\d+)\.(\d+)-(\d+)$')
 RE_BRACKET_RANGE  = re.compile(r'^(\d+\.\d+\.\d+)\.\[(\d+)-(\d+)\]$')
 RE_IP_RANGE_FULL  = re.compile(r'^(\d+\.\d+\.\d+\.\d+)-(\d+\.\d+\.\d+\.\d+)$')
+RE_IP6_RANGE_FULL = re.compile(r'^([0-9A-Fa-f:.]*:[0-9A-Fa-f:.]*)-([0-9A-Fa-f:.]*:[0-9A-Fa-f:.]*)$')
+
+# A token expands to one of: (4 or 6, lo, hi) integer address range, (0, name, None), or None (invalid, skip)
+Span = Tuple[int, object, Optional[int]]
+
+def _tokens(text):
+    return (t for t in re.split(r'[\s,;]+', text.strip()) if t) if text else iter(())
 
-def _expand_last_octet(prefix, a, b, limit):
-    a, b = int(a), int(b)
-    if a > b: a, b = b, a
-    out = []
-    for x in range(a, b+1):
-        if 0 <= x <= 255:
-            out.append(f"{prefix}.{x}")
-            if len(out) >= limit: break
-    return out
-
-def _expand_ip_range_full(a, b, limit):
+def _token_span(tok) -> Optional[Span]:
+    if '/' in tok:
+        try:
+            net = ipaddress.ip_network(tok, strict=False)
+        except ValueError:
+            net = None
+        if net is not None:
+            lo, hi = int(net.network_address), int(net.broadcast_address)
+            # Same addresses as net.hosts(): no network/broadcast address except on /31-/32 (/127-/128)
+            if net.max_prefixlen - net.prefixlen >= 2:
+                lo, hi = lo + 1, (hi - 1 if net.version == 4 else hi)
+            return (net.version, lo, hi)
+    m = RE_IP_RANGE_FULL.match(tok)
+    if m:
+        try:
+            a, b = int(ipaddress.IPv4Address(m.group(1))), int(ipaddress.IPv4Address(m.group(2)))
+        except ValueError:
+            return None
+        return (4, min(a, b), max(a, b))
+    m = RE_IP6_RANGE_FULL.match(tok)
+    if m:
+        try:
+            a, b = int(ipaddress.IPv6Address(m.group(1))), int(ipaddress.IPv6Address(m.group(2)))
+        except ValueError:
+            return None
+        return (6, min(a, b), max(a, b))
+    m = RE_LAST_OCT_RANGE.match(tok) or RE_BRACKET_RANGE.match(tok)
+    if m:
+        try:
+            base = int(ipaddress.IPv4Address(f"{m.group(1)}.0"))
+        except ValueError:
+            return (0, tok, None)
+        a, b = sorted((int(m.group(2)), int(m.group(3))))
+        a, b = max(a, 0), min(b, 255)
+        return (4, base + a, base + b) if a <= b else None
     try:
-        a_ip = ipaddress.IPv4Address(a)
-        b_ip = ipaddress.IPv4Address(b)
-    except Exception:
-        return []
-    if int(a_ip) > int(b_ip):
-        a_ip, b_ip = b_ip, a_ip
-    out = []
-    cur = int(a_ip); end = int(b_ip)
-    while cur <= end and len(out) < limit:
-        out.append(str(ipaddress.IPv4Address(cur)))
-        cur += 1
-    return out
-
-def parse_hosts(text, limit=4096):
-    if not text: return []
-    tokens = [t for t in re.split(r'[\s,;]+', text.strip()) if t]
-    results = []
-    for tok in tokens:
-        if len(results) >= limit: break
-        if '/' in tok:
-            try:
-                for ip in ipaddress.ip_network(tok, strict=False).hosts():
-                    results.append(str(ip))
-                    if len(results) >= limit: break
-                continue
-            except Exception:
-                pass
-        m = RE_IP_RANGE_FULL.match(tok)
-        if m:
-            results.extend(_expand_ip_range_full(m.group(1), m.group(2), limit - len(results))); continue
-        m = RE_LAST_OCT_RANGE.match(tok)
-        if m:
-            results.extend(_expand_last_octet(m.group(1), m.group(2), m.group(3), limit - len(results))); continue
-        m = RE_BRACKET_RANGE.match(tok)
-        if m:
-            results.extend(_expand_last_octet(m.group(1), m.group(2), m.group(3), limit - len(results))); continue
-        results.append(tok)
-    out, seen = [], set()
-    for r in results:
-        if r not in seen:
-            seen.add(r); out.append(r)
-            if len(out) >= limit: break
-    return out
+        ip = ipaddress.ip_address(tok)
+    except ValueError:
+        return (0, tok, None)
+    if getattr(ip, "scope_id", None):
+        return (0, tok, None)  # fe80::1%eth0: the zone would not survive the integer round-trip
+    return (ip.version, int(ip), int(ip))
+
+class TargetSet:
+    """
+    A set of hosts as sorted integer interval sets, one per address family,
+    plus a plain set for names.  Membership is O(log n) in the number of
+    ranges; union and difference work range by range, never per address.
+    """
+    def __init__(self, hosts=()):
+        self.families = {4: IntervalSet(), 6: IntervalSet()}
+        self.names = set()
+        for h in hosts: self.add(h)
+
+    @staticmethod
+    def _key(host):
+        try:
+            ip = ipaddress.ip_address(host)
+        except ValueError:
+            return 0, host
+        if getattr(ip, "scope_id", None):
+            return 0, host  # scoped literals are kept verbatim, like names
+        return ip.version, int(ip)
+
+    def add(self, host) -> bool:
+        fam, k = self._key(host)
+        if fam == 0:
+            if k in self.names: return False
+            self.names.add(k); return True
+        return bool(self.families[fam].add(k, k))
+
+    def discard(self, host):
+        fam, k = self._key(host)
+        if fam == 0: self.names.discard(k)
+        else: self.families[fam].discard(k, k)
+
+    def __contains__(self, host) -> bool:
+        fam, k = self._key(host)
+        return k in self.names if fam == 0 else k in self.families[fam]
+
+    def __len__(self):
+        return len(self.names) + sum(len(iv) for iv in self.families.values())
+
+    def missing(self, span):
+        """Parts of a token span not in this set: [(lo, hi)] for addresses, [(name, None)] for a new name."""
+        fam, lo, hi = span
+        if fam == 0: return [] if lo in self.names else [(lo, None)]
+        return self.families[fam].missing(lo, hi)
+
+    def add_span(self, span):
+        """Add a token span; return the parts that were new (see missing)."""
+        fam, lo, hi = span
+        if fam == 0:
+            if lo in self.names: return []
+            self.names.add(lo); return [(lo, None)]
+        return self.families[fam].add(lo, hi)
+
+    def copy(self) -> "TargetSet":
+        out = TargetSet()
+        out.families = {f: iv.copy() for f, iv in self.families.items()}
+        out.names = set(self.names)
+        return out
+
+    def _combine(self, other, op):
+        out = TargetSet()
+        out.families = {f: op(iv, other.families[f]) for f, iv in self.families.items()}
+        return out
+
+    def union(self, other) -> "TargetSet":
+        out = self._combine(other, IntervalSet.union); out.names = self.names | other.names
+        return out
+
+    def difference(self, other) -> "TargetSet":
+        out = self._combine(other, IntervalSet.difference); out.names = self.names - other.names
+        return out
+
+    __or__ = union
+    __sub__ = difference
+
+    @classmethod
+    def from_text(cls, text) -> "TargetSet":
+        """Everything a host expression expands to, without expanding it."""
+        out = cls()
+        for tok in _tokens(text):
+            span = _token_span(tok)
+            if span is not None: out.add_span(span)
+        return out
+
+def _new_parts(seen, exclude, span):
+    parts = seen.add_span(span)
+    if exclude is None or not parts:
+        return parts
+    fam = span[0]
+    return [q for p in parts for q in exclude.missing((fam,) + p if fam else (0, p[0], None))]
+
+def iter_hosts(text, exclude: Optional[TargetSet] = None) -> Iterator[str]:
+    """
+    Hosts in input order, expanded and deduplicated lazily; nothing is built
+    up front.  Hosts already in `exclude` (e.g. those being monitored) are skipped.
+    """
+    seen = TargetSet()
+    for tok in _tokens(text):
+        span = _token_span(tok)
+        if span is None: continue
+        fam = span[0]
+        for lo, hi in _new_parts(seen, exclude, span):
+            if fam == 0:
+                yield lo; continue
+            cls = ipaddress.IPv4Address if fam == 4 else ipaddress.IPv6Address
+            for n in range(lo, hi + 1):
+                yield str(cls(n))
+
+def count_hosts(text, exclude: Optional[TargetSet] = None) -> int:
+    """Exact number of hosts iter_hosts would yield, without expanding any range."""
+    seen = TargetSet()
+    total = 0
+    for tok in _tokens(text):
+        span = _token_span(tok)
+        if span is None: continue
+        parts = _new_parts(seen, exclude, span)
+        total += len(parts) if span[0] == 0 else sum(hi - lo + 1 for lo, hi in parts)
+    return total
+
+def parse_hosts(text, limit=4096, exclude: Optional[TargetSet] = None):
+    return list(islice(iter_hosts(text, exclude), limit))
@@ -0,0 +1,239 @@
+# icmp.py
+"""
+In-process ICMP echo engine.
+
+Sends echo requests over an unprivileged ICMP datagram socket where the OS
+allows it (Linux with a suitable net.ipv4.ping_group_range), and falls back
+to a raw socket otherwise (root / CAP_NET_RAW / Administrator).  RTT is
+measured in-process with perf_counter_ns, so no process is spawned per ping.
+"""
+import os, socket, struct, select, itertools, random
+from time import perf_counter_ns
+from typing import Dict, Optional, Tuple
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMP6_ECHO_REQUEST = 128
+ICMP6_ECHO_REPLY = 129
+
+# Not every Python build exposes these constants; values are the Linux ones.
+IP_RECVTTL = getattr(socket, "IP_RECVTTL", 12)
+IP_TTL = getattr(socket, "IP_TTL", 2)
+IPV6_RECVHOPLIMIT = getattr(socket, "IPV6_RECVHOPLIMIT", 51)
+IPV6_HOPLIMIT = getattr(socket, "IPV6_HOPLIMIT", 52)
+
+RCVBUF_BYTES = 1 << 20
+
+_HDR = struct.Struct("!BBHHH")
+_PAYLOAD = b"ZestyPing-echo\x00\x00" * 2  # 32 bytes, like Windows ping
+
+
+def _failure() -> Dict:
+    return {"success": False, "latency_ms": None, "ip": None, "ttl": None}
+
+
+def checksum(data: bytes) -> int:
+    """RFC 1071 internet checksum."""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def parse_literal(host: str) -> Optional[Tuple[int, str]]:
+    """
+    Return (family, ip) if host is an IP literal, without touching the resolver.
+    ip is in canonical form ("0:0::1" -> "::1"), the form reply source addresses
+    come back in, so replies can be matched against it.
+    """
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            return family, socket.inet_ntop(family, socket.inet_pton(family, host))
+        except (OSError, ValueError):
+            pass
+    return None
+
+
+def resolve(host: str) -> Optional[Tuple[int, str]]:
+    """Return (family, ip) for a host name or literal, or None if it does not resolve."""
+    lit = parse_literal(host)
+    if lit is not None:
+        return lit
+    try:
+        info = socket.getaddrinfo(host, None, 0, socket.SOCK_RAW)
+    except (socket.gaierror, UnicodeError, OSError):
+        return None
+    return pick_address(info)
+
+
+def pick_address(info) -> Optional[Tuple[int, str]]:
+    """Pick (family, ip) from getaddrinfo results, preferring IPv4 like the system ping does."""
+    for fam in (socket.AF_INET, socket.AF_INET6):
+        for family, _, _, _, addr in info:
+            if family == fam:
+                return family, addr[0]
+    return None
+
+
+class IcmpSocket:
+    """
+    One non-blocking ICMP echo socket for a single address family.
+
+    Datagram sockets are tried first; the kernel then owns the echo
+    identifier (it is the socket's local "port") and only delivers our own
+    replies.  Raw sockets see every ICMP packet on the box, so replies are
+    filtered by identifier here.
+    """
+
+    def __init__(self, family: int = socket.AF_INET):
+        self.family = family
+        proto = socket.IPPROTO_ICMP if family == socket.AF_INET else socket.IPPROTO_ICMPV6
+        try:
+            sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+            self.raw = False
+        except OSError:
+            sock = socket.socket(family, socket.SOCK_RAW, proto)
+            self.raw = True
+        sock.setblocking(False)
+        try:
+            # Many hosts answering in the same instant must not overflow the queue.
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF_BYTES)
+        except OSError:
+            pass
+        self.sock = sock
+        if self.raw:
+            self.ident = random.randrange(1, 0x10000) ^ (os.getpid() & 0xFFFF) or 1
+        else:
+            sock.bind(("", 0) if family == socket.AF_INET else ("::", 0))
+            self.ident = sock.getsockname()[1]
+        # Ask for the reply TTL / hop limit as ancillary data where the IP header is not visible.
+        try:
+            if family == socket.AF_INET and not self.raw:
+                sock.setsockopt(socket.IPPROTO_IP, IP_RECVTTL, 1)
+            elif family == socket.AF_INET6:
+                sock.setsockopt(socket.IPPROTO_IPV6, IPV6_RECVHOPLIMIT, 1)
+        except OSError:
+            pass
+        self._seq = itertools.count(random.randrange(0x10000))
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def next_seq(self) -> int:
+        return next(self._seq) & 0xFFFF
+
+    def send(self, ip: str, seq: int, payload: bytes = _PAYLOAD) -> int:
+        """Send one echo request and return its perf_counter_ns send time."""
+        if self.family == socket.AF_INET:
+            pkt = _HDR.pack(ICMP_ECHO_REQUEST, 0, 0, self.ident, seq) + payload
+            pkt = pkt[:2] + struct.pack("!H", checksum(pkt)) + pkt[4:]
+        else:
+            # The kernel fills in the ICMPv6 checksum (it covers the pseudo-header).
+            pkt = _HDR.pack(ICMP6_ECHO_REQUEST, 0, 0, self.ident, seq) + payload
+        t = perf_counter_ns()
+        self.sock.sendto(pkt, (ip, 0))
+        return t
+
+    def recv(self) -> Optional[Tuple[str, int, Optional[int], int]]:
+        """
+        Read one packet if available.
+        Returns (src_ip, seq, ttl, recv_ns) for our echo replies, None for anything else.
+        Raises BlockingIOError when the socket is drained.
+        """
+        data, anc, _, addr = self.sock.recvmsg(2048, socket.CMSG_SPACE(4))
+        t = perf_counter_ns()
+        ttl = None
+        if self.family == socket.AF_INET and self.raw:
+            ihl = (data[0] & 0x0F) * 4
+            ttl = data[8]
+            data = data[ihl:]
+        for level, kind, value in anc:
+            if (level, kind) in ((socket.IPPROTO_IP, IP_TTL), (socket.IPPROTO_IPV6, IPV6_HOPLIMIT)) and len(value) >= 4:
+                ttl = struct.unpack("=i", value[:4])[0]
+        if len(data) < 8:
+            return None
+        kind, _, _, ident, seq = _HDR.unpack_from(data)
+        want = ICMP_ECHO_REPLY if self.family == socket.AF_INET else ICMP6_ECHO_REPLY
+        if kind != want or (self.raw and ident != self.ident):
+            return None
+        return addr[0], seq, ttl, t
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def available() -> bool:
+    """True if this process may open an ICMP socket (datagram or raw)."""
+    try:
+        IcmpSocket(socket.AF_INET).close()
+        return True
+    except OSError:
+        return False
+
+
+class IcmpProber:
+    """
+    Blocking single-target prober with the same result dict as utils.ping_host.
+    Sockets are opened lazily per address family and reused between probes,
+    so a HostWorker pays the socket setup once per run, not once per sample.
+    """
+
+    def __init__(self):
+        self._socks: Dict[int, IcmpSocket] = {}
+
+    def _sock(self, family: int) -> IcmpSocket:
+        s = self._socks.get(family)
+        if s is None:
+            s = self._socks[family] = IcmpSocket(family)
+        return s
+
+    def ping(self, host: str, timeout_ms: int = 1000) -> Dict:
+        target = resolve(host)
+        if target is None:
+            return _failure()
+        family, ip = target
+        try:
+            sock = self._sock(family)
+            seq = sock.next_seq()
+            sent = sock.send(ip, seq)
+        except OSError:
+            return _failure()
+        deadline = sent + timeout_ms * 1_000_000
+        while True:
+            remaining = (deadline - perf_counter_ns()) / 1e9
+            if remaining <= 0:
+                return _failure()
+            ready, _, _ = select.select([sock.sock], [], [], remaining)
+            if not ready:
+                return _failure()
+            try:
+                while True:
+                    got = sock.recv()
+                    if got is None:
+                        continue
+                    src, rseq, ttl, recv_ns = got
+                    if rseq == seq and src == ip:
+                        return {"success": True, "latency_ms": round((recv_ns - sent) / 1e6, 3), "ip": src, "ttl": ttl}
+            except (BlockingIOError, InterruptedError):
+                continue
+            except OSError:
+                return _failure()
+
+    def close(self):
+        for s in self._socks.values():
+            s.close()
+        self._socks.clear()
+
+
+def ping_host(host: str, timeout_ms: int = 1000) -> Dict:
+    """One-shot native ping; drop-in for utils.ping_host."""
+    p = IcmpProber()
+    try:
+        return p.ping(host, timeout_ms)
+    finally:
+        p.close()
@@ -0,0 +1,122 @@
+# intervals.py
+"""
+Sorted sets of integers stored as disjoint closed intervals.
+
+Address ranges and CIDR blocks are contiguous runs of integers, so a set of
+targets costs one (lo, hi) pair per run instead of one string per address:
+a /16 is a single interval, and overlaps between tokens are found by bisecting
+the interval bounds rather than by hashing every expanded address.  Membership
+is O(log n) in the number of intervals; union and difference are linear merges
+of the interval lists.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, Tuple
+
+
+class IntervalSet:
+    __slots__ = ("_lo", "_hi", "_count")
+
+    def __init__(self):
+        self._lo: List[int] = []   # interval starts, ascending
+        self._hi: List[int] = []   # matching inclusive ends
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _span(self, lo: int, hi: int) -> Tuple[int, int]:
+        """Index range [i, j) of stored intervals overlapping or adjacent to [lo, hi]."""
+        return bisect_left(self._hi, lo - 1), bisect_right(self._lo, hi + 1)
+
+    def missing(self, lo: int, hi: int) -> List[Tuple[int, int]]:
+        """Sub-intervals of [lo, hi] not in the set, ascending."""
+        i, j = self._span(lo, hi)
+        los, his = self._lo, self._hi
+        out: List[Tuple[int, int]] = []
+        cur = lo
+        for k in range(i, j):
+            if los[k] > cur:
+                out.append((cur, min(los[k] - 1, hi)))
+            cur = max(cur, his[k] + 1)
+        if cur <= hi:
+            out.append((cur, hi))
+        return out
+
+    def add(self, lo: int, hi: int) -> List[Tuple[int, int]]:
+        """Add [lo, hi]; return the sub-intervals that were not already present, ascending."""
+        new = self.missing(lo, hi)
+        i, j = self._span(lo, hi)
+        if i < j:
+            lo, hi = min(lo, self._lo[i]), max(hi, self._hi[j - 1])
+        self._lo[i:j] = [lo]; self._hi[i:j] = [hi]
+        self._count += sum(b - a + 1 for a, b in new)
+        return new
+
+    def discard(self, lo: int, hi: int):
+        """Remove [lo, hi], splitting any interval it cuts through."""
+        los, his = self._lo, self._hi
+        i, j = bisect_left(his, lo), bisect_right(los, hi)  # overlapping only
+        if i >= j:
+            return
+        keep_lo: List[int] = []; keep_hi: List[int] = []
+        if los[i] < lo:
+            keep_lo.append(los[i]); keep_hi.append(lo - 1)
+        if his[j - 1] > hi:
+            keep_lo.append(hi + 1); keep_hi.append(his[j - 1])
+        removed = sum(min(his[k], hi) - max(los[k], lo) + 1 for k in range(i, j))
+        los[i:j] = keep_lo; his[i:j] = keep_hi
+        self._count -= removed
+
+    def __contains__(self, x: int) -> bool:
+        i = bisect_right(self._lo, x) - 1
+        return i >= 0 and x <= self._hi[i]
+
+    def copy(self) -> "IntervalSet":
+        out = IntervalSet()
+        out._lo = list(self._lo); out._hi = list(self._hi); out._count = self._count
+        return out
+
+    @classmethod
+    def _from_sorted(cls, pairs) -> "IntervalSet":
+        """Build from ascending (lo, hi) pairs, merging overlaps and neighbours in one pass."""
+        out = cls(); los, his = out._lo, out._hi
+        for lo, hi in pairs:
+            if his and lo <= his[-1] + 1:
+                if hi > his[-1]:
+                    his[-1] = hi
+            else:
+                los.append(lo); his.append(hi)
+        out._count = sum(hi - lo + 1 for lo, hi in zip(los, his))
+        return out
+
+    def union(self, other: "IntervalSet") -> "IntervalSet":
+        """Linear merge of both interval lists."""
+        return IntervalSet._from_sorted(heapq.merge(self.intervals(), other.intervals()))
+
+    def difference(self, other: "IntervalSet") -> "IntervalSet":
+        """Linear sweep: clip each interval by the other set's intervals."""
+        olo, ohi = other._lo, other._hi
+        out = []; k = 0
+        for lo, hi in self.intervals():
+            while k < len(olo) and ohi[k] < lo:
+                k += 1
+            cur = lo; m = k
+            while m < len(olo) and olo[m] <= hi:
+                if olo[m] > cur:
+                    out.append((cur, olo[m] - 1))
+                cur = max(cur, ohi[m] + 1)
+                m += 1
+            if cur <= hi:
+                out.append((cur, hi))
+        return IntervalSet._from_sorted(out)
+
+    __or__ = union
+    __sub__ = difference
+
+    def intervals(self) -> Iterator[Tuple[int, int]]:
+        return zip(self._lo, self._hi)
+
+    def __iter__(self) -> Iterator[int]:
+        for lo, hi in zip(self._lo, self._hi):
+            yield from range(lo, hi + 1)
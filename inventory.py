@@ -0,0 +1,108 @@
+# inventory.py
+"""
+Host inventory in a local SQLite database.
+
+Hosts and their descriptions live in an indexed table instead of one big JSON
+document, so saving touches only the rows that changed, every write is an
+atomic transaction (a crash leaves the previous state intact), and startup can
+load just the hosts of some descriptions.  The JSON layout config.json has
+always used ("hosts" + "host_descriptions") can still be imported and
+exported.
+"""
+import json, os, sqlite3, time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    host        TEXT PRIMARY KEY,
+    description TEXT NOT NULL DEFAULT '',
+    position    INTEGER NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hosts_description ON hosts(description);
+CREATE INDEX IF NOT EXISTS hosts_position ON hosts(position);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _chunks(items: Sequence, n: int = 500):
+    # Stay under SQLite's bound-parameter limit in IN (...) lists
+    for i in range(0, len(items), n):
+        yield items[i:i + n]
+
+
+class Inventory:
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM hosts").fetchone()[0]
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def upsert(self, rows: Iterable[Tuple[str, str]]):
+        """Insert or update (host, description) pairs in one transaction; new hosts go to the end."""
+        now = time.time()
+        with self._db:
+            start = self._db.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM hosts").fetchone()[0]
+            self._db.executemany(
+                "INSERT INTO hosts (host, description, position, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(host) DO UPDATE SET description = excluded.description, updated_at = excluded.updated_at",
+                ((h, d or "", start + i, now) for i, (h, d) in enumerate(rows)),
+            )
+
+    def remove(self, hosts: Iterable[str]):
+        hosts = list(hosts)
+        with self._db:
+            for part in _chunks(hosts):
+                self._db.execute(f"DELETE FROM hosts WHERE host IN ({','.join('?' * len(part))})", part)
+
+    def load(self, groups: Optional[Sequence[str]] = None) -> List[Tuple[str, str]]:
+        """(host, description) in list order; with groups, only hosts whose description is one of them."""
+        sql = "SELECT host, description FROM hosts"
+        args = list(groups or ())
+        if args:
+            sql += f" WHERE description IN ({','.join('?' * len(args))})"
+        return self._db.execute(sql + " ORDER BY position", args).fetchall()
+
+    # ---------- config.json compatibility ----------
+
+    def import_json(self, path: str) -> int:
+        """Upsert the hosts of a config.json-style file; returns how many were read."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        hosts = data.get("hosts", [])
+        desc = data.get("host_descriptions", {})
+        self.upsert((h, desc.get(h, "")) for h in hosts)
+        return len(hosts)
+
+    def export_json(self, path: str):
+        """Write every host in config.json's layout, atomically."""
+        rows = self.load()
+        write_json_atomic(path, {"hosts": [h for h, _ in rows], "host_descriptions": dict(rows)})
+
+
+def write_json_atomic(path: str, data: Dict):
+    """Write to a temporary file next to path, then rename over it: readers see old or new, never half."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
@@ -1,9 +1,18 @@
 from dataclasses import dataclass, field
+from array import array
 from collections import deque
-from typing import Deque, Optional, Tuple, List
-import statistics
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+import math
+import sys
+from sketch import LatencySketch, PERCENTILES
+from rollup import Rollups
+from outages import OutageTracker
+from quality import JitterTracker, mos
+from detectors import ALERTS, AlertLog, ShiftDetector
 
-@dataclass
+_NAN = float("nan")
+
+@dataclass(slots=True)
 class PingSample:
     ts: float
     host: str
@@ -12,27 +21,316 @@ class PingSample:
     ip: Optional[str] = None
     ttl: Optional[int] = None
     seq: int = 0
+    span: int = 1  # configured intervals this probe stands for; > 1 means the host was backed off
+
+
+class SampleRing:
+    """
+    Fixed-capacity columnar ring buffer of one host's samples.
+
+    Every field lives in its own typed array: timestamps and latencies as
+    doubles (NaN = no reply), TTL as a short (-1 = unknown), success as a
+    bitmap, and IPs as indexes into a small per-host table of interned
+    strings.  That is ~35 bytes per sample instead of a PingSample instance
+    with its own strings.  Indexing and iteration rebuild PingSample objects
+    on demand; the column helpers below avoid that for hot paths.
+    """
+
+    __slots__ = ("host", "capacity", "_start", "_size", "_ts", "_lat", "_ok", "_ttl", "_ip", "_seq", "_span", "_ips", "_ip_index")
+
+    def __init__(self, host: str, capacity: int):
+        self.host = host
+        self.capacity = max(1, int(capacity))
+        self._alloc(self.capacity)
+        self._ips: List[Optional[str]] = [None]
+        self._ip_index: Dict[Optional[str], int] = {None: 0}
+
+    def _alloc(self, n: int):
+        self._start = 0; self._size = 0
+        self._ts = array("d", bytes(8 * n))
+        self._lat = array("d", [_NAN]) * n
+        self._ok = bytearray((n + 7) // 8)
+        self._ttl = array("h", [-1]) * n
+        self._ip = array("I", bytes(4 * n))
+        self._seq = array("q", bytes(8 * n))
+        self._span = array("I", bytes(4 * n))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _phys(self, k: int) -> int:
+        if k < 0:
+            k += self._size
+        if not 0 <= k < self._size:
+            raise IndexError("sample index out of range")
+        return (self._start + k) % self.capacity
+
+    def _intern(self, ip: Optional[str]) -> int:
+        idx = self._ip_index.get(ip)
+        if idx is None:
+            idx = self._ip_index[ip] = len(self._ips)
+            self._ips.append(sys.intern(ip))
+        return idx
+
+    def append(self, s: PingSample) -> Optional[Tuple[bool, float, int]]:
+        """Store s; if the ring was full, return the evicted sample's (success, latency, span)."""
+        n = self.capacity
+        evicted = None
+        if self._size < n:
+            i = (self._start + self._size) % n
+            self._size += 1
+        else:
+            i = self._start  # overwrite the oldest
+            self._start = (i + 1) % n
+            evicted = (bool((self._ok[i >> 3] >> (i & 7)) & 1), self._lat[i], self._span[i])
+        self._ts[i] = s.ts
+        ok = bool(s.success and s.latency_ms is not None)
+        self._lat[i] = s.latency_ms if ok else _NAN
+        bit = 1 << (i & 7)
+        if s.success:
+            self._ok[i >> 3] |= bit
+        else:
+            self._ok[i >> 3] &= ~bit & 0xFF
+        self._ttl[i] = s.ttl if s.ttl is not None else -1
+        self._ip[i] = self._intern(s.ip)
+        self._seq[i] = s.seq
+        self._span[i] = s.span
+        return evicted
+
+    def _sample(self, i: int) -> PingSample:
+        lat = self._lat[i]; ttl = self._ttl[i]
+        return PingSample(
+            ts=self._ts[i], host=self.host, success=bool((self._ok[i >> 3] >> (i & 7)) & 1),
+            latency_ms=None if lat != lat else lat, ip=self._ips[self._ip[i]],
+            ttl=None if ttl < 0 else ttl, seq=self._seq[i], span=self._span[i],
+        )
+
+    def __getitem__(self, k: int) -> PingSample:
+        return self._sample(self._phys(k))
+
+    def __iter__(self) -> Iterator[PingSample]:
+        for k in range(self._size):
+            yield self._sample((self._start + k) % self.capacity)
+
+    # ---------- column views, oldest first ----------
+
+    def _ordered(self, col: array) -> array:
+        end = self._start + self._size
+        if end <= self.capacity:
+            return col[self._start:end]
+        return col[self._start:] + col[:end - self.capacity]
+
+    def _ok_bits(self) -> int:
+        """Success flags as an int, bit k = k-th oldest sample."""
+        v = int.from_bytes(self._ok, "little")
+        n, start, size = self.capacity, self._start, self._size
+        if start:
+            # The ring is full whenever start != 0; rotate so the oldest sample is bit 0
+            v = (v >> start) | ((v & ((1 << start) - 1)) << (n - start))
+        return v & ((1 << size) - 1)
+
+    def timestamps(self) -> array:
+        return self._ordered(self._ts)
+
+    def latencies(self) -> array:
+        """Latency per sample in ms, NaN where there was no reply."""
+        return self._ordered(self._lat)
+
+    def spans(self) -> array:
+        return self._ordered(self._span)
+
+    def ok_bitmap(self) -> bytes:
+        """Success flags packed little-endian, bit k = k-th oldest sample (for numpy.unpackbits)."""
+        return self._ok_bits().to_bytes((self._size + 7) // 8, "little")
+
+    def successes(self) -> List[bool]:
+        bits = self._ok_bits()
+        return [bool((bits >> k) & 1) for k in range(self._size)]
+
+    def recv_count(self) -> int:
+        return self._ok_bits().bit_count()
+
+    def resize(self, n: int):
+        """Change capacity, keeping the newest samples; copies whole arrays, not Python objects."""
+        n = max(1, int(n))
+        keep = min(self._size, n)
+        drop = self._size - keep
+        cols = {}
+        for name, fill in (("_ts", None), ("_lat", _NAN), ("_ttl", -1), ("_ip", None), ("_seq", None), ("_span", None)):
+            col = self._ordered(getattr(self, name))[drop:]
+            pad = array(col.typecode, [fill]) * (n - keep) if fill is not None else array(col.typecode, bytes(col.itemsize * (n - keep)))
+            cols[name] = col + pad
+        bits = self._ok_bits() >> drop
+        for name, col in cols.items():
+            setattr(self, name, col)
+        self._ok = bytearray(bits.to_bytes((n + 7) // 8, "little"))
+        self.capacity = n; self._start = 0; self._size = keep
+
+    def clear(self):
+        self._start = 0; self._size = 0
+        self._ips = [None]; self._ip_index = {None: 0}
+
+
+def _sqrt_frac(num: int, den: int) -> float:
+    """sqrt(num / den) correctly rounded, via round-to-odd integer sqrt (as in statistics)."""
+    q = (num.bit_length() - den.bit_length() - 109) // 2
+    if q >= 0:
+        den <<= 2 * q
+    else:
+        num <<= -2 * q
+    root = math.isqrt(num // den)
+    root |= root * root * den != num
+    return root * 2.0 ** q if q >= 0 else root / (1 << -q)
+
+
+class WindowStats:
+    """
+    Running aggregates over a SampleRing's window, updated on every append and
+    eviction: received count, span-weighted covered/lost intervals, exact
+    latency sum and sum of squares, monotonic deques for min/max, and a
+    quantile sketch of the window's latencies.
+
+    The sums are Python ints holding each latency scaled by 2**scale, where
+    scale is the finest binary exponent among the window's latencies (a float
+    x = num / 2**k becomes num << (scale - k)).  They never drift, mean and
+    pstdev come out exactly as statistics.mean / statistics.pstdev would, and
+    for ordinary latencies the integers stay near 53 and 106 bits.  A finer
+    value raises the scale (shifting the sums up); it drops back to 0 when
+    the window empties or is rebuilt.
+    """
+
+    __slots__ = ("recv", "covered", "lost", "n", "total", "squares", "scale", "_added", "_min", "_max", "sketch")
+
+    def __init__(self):
+        self.sketch = LatencySketch()
+        self.clear()
+
+    def clear(self):
+        self.recv = 0; self.covered = 0; self.lost = 0
+        self.n = 0; self.total = 0; self.squares = 0; self.scale = 0
+        self._added = 0  # samples ever pushed; positions key the min/max deques
+        self._min: Deque[Tuple[int, float]] = deque()
+        self._max: Deque[Tuple[int, float]] = deque()
+        self.sketch.clear()
+
+    def _fixed(self, v: float) -> int:
+        num, den = v.as_integer_ratio()
+        k = den.bit_length() - 1
+        if k > self.scale:
+            d = k - self.scale
+            self.total <<= d; self.squares <<= 2 * d; self.scale = k
+        return num << (self.scale - k)
+
+    def push(self, success: bool, lat: float, span: int):
+        pos = self._added; self._added += 1
+        self.covered += span
+        if success:
+            self.recv += 1
+        else:
+            self.lost += span
+        if lat == lat:
+            if not self.n:
+                self.scale = 0  # the sums are 0 at any scale, so start coarse again
+            x = self._fixed(lat)
+            self.n += 1; self.total += x; self.squares += x * x
+            self.sketch.add(lat)
+            while self._min and self._min[-1][1] >= lat:
+                self._min.pop()
+            self._min.append((pos, lat))
+            while self._max and self._max[-1][1] <= lat:
+                self._max.pop()
+            self._max.append((pos, lat))
+
+    def evict(self, success: bool, lat: float, span: int, window: int):
+        """Drop the oldest sample of a full window of `window` samples (call before push)."""
+        pos = self._added - window
+        self.covered -= span
+        if success:
+            self.recv -= 1
+        else:
+            self.lost -= span
+        if lat == lat:
+            x = self._fixed(lat)
+            self.n -= 1; self.total -= x; self.squares -= x * x
+            self.sketch.remove(lat)
+            if self._min and self._min[0][0] == pos:
+                self._min.popleft()
+            if self._max and self._max[0][0] == pos:
+                self._max.popleft()
+
+    def rebuild(self, ring: SampleRing):
+        self.clear()
+        for ok, lat, span in zip(ring.successes(), ring.latencies(), ring.spans()):
+            self.push(ok, lat, span)
+
+    def minimum(self) -> Optional[float]:
+        return self._min[0][1] if self._min else None
+
+    def maximum(self) -> Optional[float]:
+        return self._max[0][1] if self._max else None
+
+    def mean(self) -> Optional[float]:
+        return self.total / (self.n << self.scale) if self.n else None
+
+    def pstdev(self) -> Optional[float]:
+        if not self.n:
+            return None
+        # Population variance = (n*sum(x^2) - sum(x)^2) / n^2, all exact
+        return _sqrt_frac(self.n * self.squares - self.total * self.total, (self.n * self.n) << (2 * self.scale))
+
 
 @dataclass
 class HostStats:
     host: str
     count: int = 60
     description: str = ""  # short human-friendly label for this host
-    samples: Deque[PingSample] = field(default_factory=lambda: deque(maxlen=60))
+    alerts: AlertLog = field(default=ALERTS, repr=False, compare=False)  # where detector alerts are posted
+    samples: SampleRing = field(init=False, repr=False)
+    window: WindowStats = field(init=False, repr=False)
+    rollups: Rollups = field(init=False, repr=False)  # 1 s / 10 s / 1 min history beyond the window
+    outages: OutageTracker = field(init=False, repr=False)  # loss streaks over the whole run
+    jitter: JitterTracker = field(init=False, repr=False)
+    detector: ShiftDetector = field(init=False, repr=False)  # latency shift / loss burst alerts
+
+    def __post_init__(self):
+        self.samples = SampleRing(self.host, self.count)
+        self.window = WindowStats()
+        self.rollups = Rollups()
+        self.outages = OutageTracker()
+        self.jitter = JitterTracker()
+        self.detector = ShiftDetector(self.host)
 
     def set_count(self, n: int):
         """Adjust the sliding window length, preserving the most recent samples."""
-        old = list(self.samples)
-        self.samples = deque(old[-n:], maxlen=n)
+        self.samples.resize(n)
+        self.window.rebuild(self.samples)
         self.count = n
 
     def reset(self):
         """Clear all samples but keep the configured window size."""
-        self.samples = deque(maxlen=self.count)
+        self.samples.clear()
+        self.window.clear()
+        self.rollups.clear()
+        self.outages.clear()
+        self.jitter.clear()
+        self.detector.clear()
 
     def add(self, s: PingSample):
         """Append a new sample to this host's history."""
-        self.samples.append(s)
+        ring = self.samples
+        evicted = ring.append(s)
+        if evicted is not None:
+            self.window.evict(*evicted, ring.capacity)
+        ok = bool(s.success and s.latency_ms is not None)
+        lat = float(s.latency_ms) if ok else _NAN
+        self.window.push(bool(s.success), lat, s.span)
+        self.rollups.add(s.ts, bool(s.success), lat if ok else None, s.span)
+        self.outages.add(s.ts, bool(s.success))
+        if ok:
+            self.jitter.add(lat)
+        alert = self.detector.add(s.ts, bool(s.success), lat if ok else None)
+        if alert is not None:
+            self.alerts.post(alert)
 
     def last(self) -> Optional[PingSample]:
         """Return the most recent sample, or None if there are no samples."""
@@ -42,34 +340,31 @@ class HostStats:
         """
         Return (sent, recv, loss_pct).
         loss_pct is 0–100, where 100 means total loss (or no samples yet).
+        Samples are weighted by span, so backed-off probes of a dead host
+        count for every interval they cover and loss% is not understated.
         """
+        w = self.window
         sent = len(self.samples)
-        recv = sum(1 for s in self.samples if s.success)
-        loss_pct = (1.0 - (recv / sent)) * 100.0 if sent > 0 else 100.0
+        recv = w.recv
+        covered, lost = w.covered, w.lost
+        loss_pct = (lost / covered) * 100.0 if covered > 0 else 100.0
         return sent, recv, round(loss_pct, 1)
 
     # ---------- latency helpers / analytics foundation ----------
 
     def _latency_values(self) -> List[float]:
         """Return list of successful latency values in ms."""
-        return [
-            s.latency_ms
-            for s in self.samples
-            if s.success and s.latency_ms is not None
-        ]
+        return [v for v in self.samples.latencies() if v == v]  # NaN != NaN marks "no reply"
 
     def latency_stats(self) -> Tuple[Optional[float], Optional[float], Optional[float]]:
         """
         Min, Avg (rounded), Max latency in ms for successful pings.
         This keeps the original behavior used by the UI.
         """
-        lats: List[float] = self._latency_values()
-        if not lats:
+        w = self.window
+        if not w.n:
             return None, None, None
-        mn = min(lats)
-        avg = statistics.mean(lats)
-        mx = max(lats)
-        return mn, round(avg), mx
+        return w.minimum(), round(w.mean()), w.maximum()
 
     def latency_sigma(self) -> Tuple[Optional[float], Optional[float]]:
         """
@@ -79,15 +374,31 @@ class HostStats:
         - stdev: population standard deviation (pstdev);
           if fewer than 2 samples, stdev = None
         """
-        lats = self._latency_values()
-        if not lats:
+        w = self.window
+        if not w.n:
             return None, None
-        if len(lats) < 2:
+        if w.n < 2:
             # Only one value -> mean is defined, stdev is not meaningful
-            return statistics.mean(lats), None
-        mean = statistics.mean(lats)
-        stdev = statistics.pstdev(lats)
-        return mean, stdev
+            return w.mean(), None
+        return w.mean(), w.pstdev()
+
+    def percentiles(self, qs=PERCENTILES) -> List[Optional[float]]:
+        """
+        Latency percentiles (default p50/p95/p99) over the window, from the
+        quantile sketch: within 1% of the exact value, without sorting.
+        """
+        return self.window.sketch.quantiles(qs)
+
+    def voip(self) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        """
+        (jitter_ms, R-factor, MOS) from the running RFC 3550 jitter and the
+        window's mean latency and loss; all None until the second reply.
+        """
+        jitter = self.jitter.jitter
+        if jitter is None or not self.window.n:
+            return None, None, None
+        r, score = mos(self.window.mean(), jitter, self.counts()[2])
+        return round(jitter, 2), r, score
 
     def count_above_sigma(self, k: float = 1.0) -> int:
         """
@@ -99,8 +410,7 @@ class HostStats:
         if mean is None or stdev is None or stdev == 0:
             return 0
         threshold = mean + k * stdev
-        lats = self._latency_values()
-        return sum(1 for v in lats if v > threshold)
+        return sum(1 for v in self.samples.latencies() if v > threshold)  # NaN never compares greater
 
     def series(self):
         """
@@ -108,8 +418,6 @@ class HostStats:
         - xs: timestamps (epoch seconds)
         - ys: latency in ms for successes, or None for failures (for plotting)
         """
-        xs, ys = [], []
-        for s in self.samples:
-            xs.append(s.ts)
-            ys.append(s.latency_ms if s.success else None)
+        xs = self.samples.timestamps().tolist()
+        ys = [None if v != v else v for v in self.samples.latencies()]
         return xs, ys
@@ -0,0 +1,66 @@
+# outages.py
+"""
+Streaming loss-streak and outage tracking for one host.
+
+OutageTracker is fed every sample from HostStats.add and keeps the current
+and longest run of lost probes plus a list of outage events, each O(1) per
+sample and over the whole run rather than only the sample window.  An outage
+starts at the first lost probe of a streak of at least MIN_LOST and ends at
+the reply that breaks it.
+"""
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional
+
+MIN_LOST = 3          # lost probes in a row before a streak is reported as an outage
+MAX_EVENTS = 1000     # outages kept per host; older ones are dropped (and counted)
+
+
+@dataclass(slots=True)
+class Outage:
+    start_ts: float
+    end_ts: Optional[float]  # None while still down
+    lost: int
+
+    def duration_s(self, now: float) -> float:
+        return (self.end_ts if self.end_ts is not None else now) - self.start_ts
+
+
+class OutageTracker:
+    __slots__ = ("min_lost", "current", "longest", "_start_ts", "events", "dropped")
+
+    def __init__(self, min_lost: int = MIN_LOST, max_events: int = MAX_EVENTS):
+        self.min_lost = max(1, int(min_lost))
+        self.current = 0          # lost probes in the ongoing streak
+        self.longest = 0
+        self._start_ts = 0.0
+        self.events: Deque[Outage] = deque(maxlen=max_events)
+        self.dropped = 0
+
+    def add(self, ts: float, success: bool):
+        if success:
+            if self.current >= self.min_lost:
+                self.events[-1].end_ts = ts
+            self.current = 0
+            return
+        if not self.current:
+            self._start_ts = ts
+        self.current += 1
+        if self.current > self.longest:
+            self.longest = self.current
+        if self.current == self.min_lost:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(Outage(self._start_ts, None, self.current))
+        elif self.current > self.min_lost:
+            self.events[-1].lost = self.current
+
+    def ongoing(self) -> Optional[Outage]:
+        return self.events[-1] if self.current >= self.min_lost and self.events else None
+
+    def outages(self) -> List[Outage]:
+        return list(self.events)
+
+    def clear(self):
+        self.current = 0; self.longest = 0; self._start_ts = 0.0
+        self.events.clear(); self.dropped = 0
@@ -1,32 +1,102 @@
 
-import threading, time
+import threading, time, subprocess
+from contextlib import nullcontext
 from typing import Dict, Optional, List
 from queue import Queue
 from models import PingSample
-from utils import ping_host
+from utils import make_pinger, stream_command, parse_stream_line, STREAM_SEQ_BASE
+from dns_cache import DNS_CACHE, ping_resolved
+from sweep import SweepWorker
+from scheduler import ProbeScheduler
+from ratelimit import RateLimiter, make_limiter, make_backoff, phase_offsets
+import icmp
 class HostWorker(threading.Thread):
-    def __init__(self, host: str, interval_s: float, timeout_ms: int, max_count: Optional[int], sample_queue: Queue, stop_event: threading.Event):
+    def __init__(self, host: str, interval_s: float, timeout_ms: int, max_count: Optional[int], sample_queue: Queue, stop_event: threading.Event, engine: str = "subprocess", limiter: Optional[RateLimiter] = None, start_delay: float = 0.0, backoff_after: int = 0, backoff_max_s: float = 30.0):
         super().__init__(daemon=True); self.host=host; self.interval_s=interval_s; self.timeout_ms=timeout_ms
-        self.max_count=max_count; self.seq=0; self.sample_queue=sample_queue; self.stop_event=stop_event
+        self.max_count=max_count; self.seq=0; self.sample_queue=sample_queue; self.stop_event=stop_event; self.engine=engine
+        self.limiter=limiter; self.start_delay=start_delay; self.backoff_after=backoff_after; self.backoff_max_s=backoff_max_s
+        self.proc: Optional[subprocess.Popen] = None
+    def stop(self):
+        self.stop_event.set(); proc=self.proc
+        if proc is not None and proc.poll() is None: proc.terminate()
     def run(self):
-        next_tick=time.time()
+        if self.start_delay > 0 and self.stop_event.wait(timeout=self.start_delay): return
+        if self.engine == "stream":
+            try:
+                # Resolved once per run: the process keeps pinging the address it started with
+                target=DNS_CACHE.resolve(self.host) or self.host
+                self.proc=subprocess.Popen(stream_command(target, self.interval_s, self.timeout_ms, self.max_count), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1)
+            except OSError: self.proc=None
+            if self.proc is not None: return self._run_stream()
+        ping=make_pinger(self.engine); next_tick=time.time()
+        # ticks counts configured intervals covered, so a backed-off host still ends with the others
+        backoff=make_backoff(self.interval_s, self.backoff_after, self.backoff_max_s); span=1; ticks=0
         while not self.stop_event.is_set():
-            if self.max_count is not None and self.seq >= self.max_count: break
-            res=ping_host(self.host, timeout_ms=self.timeout_ms)
-            self.sample_queue.put(PingSample(ts=time.time(), host=self.host, success=res["success"], latency_ms=res.get("latency_ms"), ip=res.get("ip"), ttl=res.get("ttl"), seq=self.seq))
-            self.seq += 1
-            next_tick += self.interval_s; self.stop_event.wait(timeout=max(0, next_tick - time.time()))
+            if self.max_count is not None and ticks >= self.max_count: break
+            with (self.limiter.slot() if self.limiter is not None else nullcontext()):
+                res=ping_resolved(ping, self.host, self.timeout_ms)
+            self.sample_queue.put(PingSample(ts=time.time(), host=self.host, success=res["success"], latency_ms=res.get("latency_ms"), ip=res.get("ip"), ttl=res.get("ttl"), seq=self.seq, span=span))
+            self.seq += 1; ticks += span
+            if backoff is not None: span=backoff.update(res["success"])
+            next_tick += self.interval_s * span; self.stop_event.wait(timeout=max(0, next_tick - time.time()))
+    def _run_stream(self):
+        """One long-lived ping per run; each output line becomes a sample stamped when it is read."""
+        try:
+            for line in self.proc.stdout:
+                ts=time.time()
+                if self.stop_event.is_set(): break
+                parsed=parse_stream_line(line)
+                if parsed is None: continue
+                icmp_seq, res = parsed
+                seq=self.seq
+                if icmp_seq is not None:
+                    # icmp_seq is 16-bit and wraps; take the signed distance from where we are
+                    seq += ((icmp_seq - STREAM_SEQ_BASE - self.seq + 0x8000) & 0xFFFF) - 0x8000
+                if seq < self.seq: continue  # late or duplicate reply for a sample already reported
+                while self.seq < seq:  # replies the ping never reported: count them lost
+                    self.sample_queue.put(PingSample(ts=ts, host=self.host, success=False, seq=self.seq)); self.seq += 1
+                self.sample_queue.put(PingSample(ts=ts, host=self.host, success=res["success"], latency_ms=res.get("latency_ms"), ip=res.get("ip"), ttl=res.get("ttl"), seq=seq))
+                self.seq = seq + 1
+                if self.max_count is not None and self.seq >= self.max_count: break
+        finally:
+            if self.proc.poll() is None: self.proc.terminate()
+            try: self.proc.wait(timeout=1)
+            except subprocess.TimeoutExpired: self.proc.kill()
+            self.proc.stdout.close()
 class HostManager:
-    def __init__(self, sample_queue: Queue):
-        self.sample_queue=sample_queue; self.workers: Dict[str, HostWorker] = {}; self.stop_events: Dict[str, threading.Event] = {}
-    def start_host(self, host: str, interval_s: float, timeout_ms: int, max_count: Optional[int] = None):
+    def __init__(self, sample_queue: Queue, engine: str = "subprocess", pool_size: int = 0, max_pps: float = 0.0, max_in_flight: int = 0, backoff_after: int = 0, backoff_max_s: float = 30.0):
+        self.sample_queue=sample_queue; self.engine=engine; self.backoff_after=backoff_after; self.backoff_max_s=backoff_max_s; self.workers: Dict[str, HostWorker] = {}; self.stop_events: Dict[str, threading.Event] = {}
+        # Global token bucket shared by every worker (the stream engine paces itself and is not limited)
+        self.limiter=make_limiter(max_pps, max_in_flight)
+        # pool_size > 0: one scheduler thread + a bounded probe pool instead of a thread per host.
+        # The stream engine needs a process per host, so it always uses HostWorker threads.
+        self.scheduler=ProbeScheduler(sample_queue, engine, pool_size, limiter=self.limiter) if pool_size > 0 and engine != "stream" else None
+    def start_host(self, host: str, interval_s: float, timeout_ms: int, max_count: Optional[int] = None, start_delay: float = 0.0):
         if host in self.workers: return
-        ev=threading.Event(); w=HostWorker(host, interval_s, timeout_ms, max_count, self.sample_queue, ev)
+        if self.scheduler is not None:
+            self.workers[host]=self.scheduler.add(host, interval_s, timeout_ms, max_count, start_at=time.monotonic() + start_delay, backoff=make_backoff(interval_s, self.backoff_after, self.backoff_max_s)); return
+        ev=threading.Event(); w=HostWorker(host, interval_s, timeout_ms, max_count, self.sample_queue, ev, engine=self.engine, limiter=self.limiter, start_delay=start_delay, backoff_after=self.backoff_after, backoff_max_s=self.backoff_max_s)
         self.stop_events[host]=ev; self.workers[host]=w; w.start()
+    def start_hosts(self, hosts: List[str], interval_s: float, timeout_ms: int, max_count: Optional[int] = None):
+        """Start many hosts with first probes spread evenly across one interval, so they never fire in phase."""
+        for h, delay in zip(hosts, phase_offsets(len(hosts), interval_s)): self.start_host(h, interval_s, timeout_ms, max_count, start_delay=delay)
+    def start_sweep(self, hosts: List[str], interval_s: float, timeout_ms: int, max_count: Optional[int] = None):
+        """Probe many hosts from one SweepWorker (one socket, one timer); needs the icmp engine."""
+        hosts=[h for h in dict.fromkeys(hosts) if h not in self.workers]
+        if not hosts: return
+        if self.engine != "icmp" or not icmp.available():
+            self.start_hosts(hosts, interval_s, timeout_ms, max_count); return  # still phase-spread
+        ev=threading.Event(); w=SweepWorker(hosts, interval_s, timeout_ms, max_count, self.sample_queue, ev, limiter=self.limiter, backoff_after=self.backoff_after, backoff_max_s=self.backoff_max_s)
+        for h in hosts: self.stop_events[h]=ev; self.workers[h]=w
+        w.start()
     def stop_host(self, host: str):
         if host in self.workers:
-            self.stop_events[host].set(); self.workers[host].join(timeout=1.5)
-            del self.workers[host]; del self.stop_events[host]
+            w=self.workers.pop(host); ev=self.stop_events.pop(host, None)
+            if isinstance(w, SweepWorker):
+                if w.discard(host): return
+                ev.set()
+            else: w.stop()
+            w.join(timeout=1.5)
     def stop_all(self):
         for h in list(self.workers.keys()): self.stop_host(h)
     def cleanup_finished(self) -> List[str]:
@@ -34,3 +104,4 @@ class HostManager:
         for h in dead: self.workers.pop(h, None); self.stop_events.pop(h, None)
         return dead
     def running_hosts(self): return [h for h,w in self.workers.items() if w.is_alive()]
+    def limiter_stats(self) -> Optional[Dict]: return self.limiter.stats() if self.limiter is not None else None
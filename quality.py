@@ -0,0 +1,43 @@
+# quality.py
+"""
+Voice-quality estimates from ping results.
+
+JitterTracker keeps RFC 3550 interarrival jitter, updated in O(1) on every
+reply: J += (|D| - J) / 16, where D is the change in round-trip time between
+consecutive replies (the RTT stands in for the one-way transit, whose unknown
+clock offset cancels out of D anyway).
+
+mos() is the simplified ITU-T G.107 E-model commonly used for ping-based VoIP
+readiness checks: latency, jitter and loss become an R-factor (0-93.2) which
+maps onto an estimated MOS (1.0-4.5).
+"""
+from typing import Optional, Tuple
+
+
+class JitterTracker:
+    __slots__ = ("jitter", "_last")
+
+    def __init__(self):
+        self.clear()
+
+    def add(self, latency_ms: float):
+        if self._last is not None:
+            j = self.jitter or 0.0
+            self.jitter = j + (abs(latency_ms - self._last) - j) / 16.0
+        self._last = latency_ms
+
+    def clear(self):
+        self.jitter: Optional[float] = None  # ms; None before the second reply
+        self._last: Optional[float] = None
+
+
+def mos(latency_ms: float, jitter_ms: float, loss_pct: float) -> Tuple[float, float]:
+    """(R-factor, MOS) for a mean RTT, jitter and loss percentage."""
+    effective = latency_ms + 2.0 * jitter_ms + 10.0
+    if effective < 160.0:
+        r = 93.2 - effective / 40.0
+    else:
+        r = 93.2 - (effective - 120.0) / 10.0
+    r = max(0.0, min(93.2, r - 2.5 * loss_pct))
+    score = 1.0 + 0.035 * r + 0.000007 * r * (r - 60.0) * (100.0 - r)
+    return round(r, 1), round(max(1.0, min(4.5, score)), 2)
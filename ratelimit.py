@@ -0,0 +1,132 @@
+# ratelimit.py
+"""
+Probe pacing: global rate limiting shared by every worker of a host manager,
+start-phase spreading, and per-host adaptive backoff.
+
+RateLimiter is a token bucket for probes per second, plus an optional cap on
+probes in flight.  Tokens are reserved rather than polled: each caller takes a
+token immediately (possibly going into debt) and learns how long to wait, so
+waiters are served in arrival order without spinning.  The time callers spend
+waiting here is the scheduling lag the limiter adds; it is tracked in stats().
+"""
+import asyncio, threading, time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+
+class RateLimiter:
+    def __init__(self, pps: float = 0.0, max_in_flight: int = 0, burst: Optional[float] = None):
+        self.pps = float(pps); self.max_in_flight = int(max_in_flight)
+        self.burst = float(burst) if burst is not None else max(1.0, self.pps / 20)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self._sem = threading.BoundedSemaphore(self.max_in_flight) if self.max_in_flight > 0 else None
+        self._asem: Optional[asyncio.Semaphore] = None
+        self._probes = 0; self._delayed = 0; self._lag_total = 0.0; self._lag_max = 0.0
+
+    def reserve(self) -> float:
+        """Take one token; return how many seconds the caller must wait before sending."""
+        if self.pps <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.pps)
+            self._last = now
+            self._tokens -= 1.0
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.pps
+
+    def _record(self, lag_s: float):
+        with self._lock:
+            self._probes += 1
+            if lag_s > 0.001:
+                self._delayed += 1
+                self._lag_total += lag_s
+                self._lag_max = max(self._lag_max, lag_s)
+
+    def wait(self):
+        """Block for a token (no in-flight accounting); used by batched senders."""
+        t0 = time.monotonic(); delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        self._record(time.monotonic() - t0)
+
+    @contextmanager
+    def slot(self):
+        """Hold one probe slot for the duration of the block."""
+        t0 = time.monotonic(); delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        if self._sem is not None:
+            self._sem.acquire()
+        self._record(time.monotonic() - t0)
+        try:
+            yield
+        finally:
+            if self._sem is not None:
+                self._sem.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        """asyncio flavour of slot(); the in-flight cap is per event loop."""
+        t0 = time.monotonic(); delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.max_in_flight > 0 and self._asem is None:
+            self._asem = asyncio.Semaphore(self.max_in_flight)
+        if self._asem is not None:
+            await self._asem.acquire()
+        self._record(time.monotonic() - t0)
+        try:
+            yield
+        finally:
+            if self._asem is not None:
+                self._asem.release()
+
+    def stats(self) -> Dict:
+        """probes, delayed (waited > 1 ms), mean_lag_ms over delayed probes, max_lag_ms."""
+        with self._lock:
+            mean = (self._lag_total / self._delayed * 1000.0) if self._delayed else 0.0
+            return {"probes": self._probes, "delayed": self._delayed, "mean_lag_ms": round(mean, 1), "max_lag_ms": round(self._lag_max * 1000.0, 1)}
+
+
+def make_limiter(max_pps: float = 0.0, max_in_flight: int = 0) -> Optional[RateLimiter]:
+    """A RateLimiter if either limit is set, else None (no limiting, no overhead)."""
+    if max_pps > 0 or max_in_flight > 0:
+        return RateLimiter(max_pps, max_in_flight)
+    return None
+
+
+def phase_offsets(n: int, interval_s: float):
+    """Deterministic start offsets that spread n hosts evenly across one interval."""
+    return [interval_s * i / n for i in range(n)] if n else []
+
+
+class Backoff:
+    """
+    Adaptive probe interval for one host.  After `after` consecutive losses
+    every further loss doubles the wait, up to max_interval_s; the first reply
+    drops straight back to the configured interval.  Waits are whole multiples
+    ("spans") of the configured interval so samples stay on the host's grid.
+    """
+
+    def __init__(self, interval_s: float, after: int = 3, max_interval_s: float = 30.0):
+        self.after = int(after)
+        self.max_span = max(1, int(max_interval_s // interval_s)) if interval_s > 0 else 1
+        self.losses = 0
+        self.span = 1
+
+    def update(self, success: bool) -> int:
+        """Record one probe result; return the span (in intervals) to wait before the next probe."""
+        if success or self.after <= 0:
+            self.losses = 0; self.span = 1
+        else:
+            self.losses += 1
+            if self.losses >= self.after:
+                self.span = min(self.span * 2, self.max_span)
+        return self.span
+
+
+def make_backoff(interval_s: float, after: int = 0, max_interval_s: float = 30.0) -> Optional[Backoff]:
+    """A Backoff if the policy is enabled (after > 0), else None."""
+    return Backoff(interval_s, after, max_interval_s) if after > 0 else None
@@ -0,0 +1,209 @@
+# rollup.py
+"""
+Tiered downsampling of one host's samples for long runs.
+
+Every sample is folded into a 1 s, a 10 s and (for long retention) a 1 min
+bucket.  A bucket keeps sent, recv, and the count, min, max, sum and sum of
+squares of latency, so any range of buckets combines into loss%, min/avg/max
+and stdev.  Each tier keeps a fixed number of buckets (oldest dropped first),
+so memory per host is bounded no matter how long the run is, while
+HostStats.count only sizes the raw window.
+
+A bucket costs about 52 bytes, and every host carries its own tiers, so the
+retained span is a setting (configure(), from "rollup_hours"): the default
+hour is roughly 35 KB per host; a week is roughly 650 KB.  Longer history
+across many hosts belongs in the history database, not in memory.
+
+`sent` and `recv` count configured intervals: a backed-off probe counts for
+every interval its span covers, as in HostStats.counts().
+"""
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+ROLLUP_HOURS = 1.0
+FINE_S = 300        # the 1 s tier never keeps more than 5 min
+MID_S = 6 * 3600    # the 10 s tier never keeps more than 6 h
+
+
+def tiers_for(hours: float) -> Tuple[Tuple[int, int], ...]:
+    """
+    (bucket width in seconds, buckets kept) for about `hours` of history,
+    coarsest last; a tier is only added if it reaches further back than the
+    finer one before it.
+    """
+    span = max(float(hours), FINE_S / 3600.0) * 3600
+    out: List[Tuple[int, int]] = []
+    reach = 0
+    for width, cap in ((1, FINE_S), (10, MID_S), (60, None)):
+        keep = int(min(span, cap) if cap else span) // width
+        if keep * width > reach:
+            out.append((width, keep)); reach = keep * width
+    return tuple(out)
+
+
+# (bucket width in seconds, buckets kept) used by new Rollups; see configure()
+TIERS: Tuple[Tuple[int, int], ...] = tiers_for(ROLLUP_HOURS)
+
+
+def configure(hours: float):
+    """Set the span new Rollups keep (call before HostStats are created)."""
+    global TIERS
+    TIERS = tiers_for(hours)
+
+Bucket = Tuple[float, int, int, int, Optional[float], Optional[float], float, float]  # start_ts, sent, recv, n, min, max, sum, sumsq
+
+
+class Tier:
+    """Buckets of one width, oldest first, in parallel typed arrays."""
+
+    __slots__ = ("width", "keep", "_key", "_sent", "_recv", "_n", "_min", "_max", "_sum", "_sq")
+
+    def __init__(self, width: int, keep: int):
+        self.width = width; self.keep = keep
+        self._key = array("q")    # bucket number = floor(ts / width)
+        self._sent = array("I"); self._recv = array("I"); self._n = array("I")
+        self._min = array("d"); self._max = array("d")  # NaN while the bucket has no reply
+        self._sum = array("d"); self._sq = array("d")
+
+    def __len__(self) -> int:
+        return len(self._key)
+
+    def _cols(self):
+        return (self._key, self._sent, self._recv, self._n, self._min, self._max, self._sum, self._sq)
+
+    def _slot(self, key: int) -> int:
+        keys = self._key
+        if keys and keys[-1] == key:
+            return len(keys) - 1  # the common case: same bucket as the previous sample
+        i = len(keys) if not keys or keys[-1] < key else bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return i
+        if i == 0 and len(keys) >= self.keep:
+            return -1  # older than anything still kept
+        for col, v in zip(self._cols(), (key, 0, 0, 0, math.nan, math.nan, 0.0, 0.0)):
+            col.insert(i, v)
+        if len(keys) > self.keep + self.keep // 4:
+            # Trim in chunks so dropping old buckets stays amortised O(1)
+            drop = len(keys) - self.keep
+            for col in self._cols():
+                del col[:drop]
+            i -= drop
+        return i
+
+    def add(self, ts: float, success: bool, lat: Optional[float], span: int):
+        i = self._slot(int(ts // self.width))
+        if i < 0:
+            return
+        self._sent[i] += span
+        if success:
+            self._recv[i] += span
+        if lat is not None:
+            self._n[i] += 1
+            if not self._min[i] <= lat:  # also true while the slot is NaN
+                self._min[i] = lat
+            if not self._max[i] >= lat:
+                self._max[i] = lat
+            self._sum[i] += lat; self._sq[i] += lat * lat
+
+    def oldest(self) -> Optional[float]:
+        """Start of the oldest bucket still retained, honouring `keep`."""
+        if not self._key:
+            return None
+        return self._key[max(0, len(self._key) - self.keep)] * self.width
+
+    def buckets(self, t0: Optional[float] = None, t1: Optional[float] = None) -> List[Bucket]:
+        """Buckets overlapping [t0, t1]; None means unbounded."""
+        keys = self._key
+        lo = max(len(keys) - self.keep, 0)
+        if t0 is not None:
+            lo = max(lo, bisect_left(keys, int(t0 // self.width)))
+        hi = len(keys) if t1 is None else bisect_right(keys, int(t1 // self.width))
+        out: List[Bucket] = []
+        for i in range(lo, hi):
+            mn = self._min[i]; mx = self._max[i]
+            out.append((keys[i] * float(self.width), self._sent[i], self._recv[i], self._n[i],
+                        None if mn != mn else mn, None if mx != mx else mx, self._sum[i], self._sq[i]))
+        return out
+
+    def clear(self):
+        for col in self._cols():
+            del col[:]
+
+
+class Rollups:
+    """The 1 s / 10 s / 1 min tiers of one host."""
+
+    __slots__ = ("tiers", "first_ts", "last_ts")
+
+    def __init__(self, tiers=None):
+        self.tiers = [Tier(w, k) for w, k in (TIERS if tiers is None else tiers)]
+        self.first_ts: Optional[float] = None; self.last_ts: Optional[float] = None
+
+    def add(self, ts: float, success: bool, lat: Optional[float], span: int = 1):
+        for t in self.tiers:
+            t.add(ts, success, lat, span)
+        if self.first_ts is None or ts < self.first_ts:
+            self.first_ts = ts
+        if self.last_ts is None or ts > self.last_ts:
+            self.last_ts = ts
+
+    def tier_for(self, t0: Optional[float] = None, t1: Optional[float] = None, max_points: Optional[int] = None) -> Optional[Tier]:
+        """
+        Finest tier that still reaches back to t0 and, if max_points is given,
+        covers [t0, t1] in at most that many buckets.  Falls back to the
+        coarsest tier when none qualifies.
+        """
+        if self.first_ts is None:
+            return None
+        start = self.first_ts if t0 is None else max(t0, self.first_ts)
+        end = self.last_ts if t1 is None else min(t1, self.last_ts)
+        for t in self.tiers[:-1]:
+            if t.oldest() > start:
+                continue  # this tier has already dropped part of the range
+            if max_points is not None and (end - start) / t.width > max_points:
+                continue
+            return t
+        return self.tiers[-1]
+
+    def query(self, t0: Optional[float] = None, t1: Optional[float] = None, max_points: Optional[int] = None) -> List[Bucket]:
+        """Buckets covering [t0, t1] (None = unbounded) at the finest resolution that fits."""
+        t = self.tier_for(t0, t1, max_points)
+        return t.buckets(t0, t1) if t is not None else []
+
+    def summary(self, t0: Optional[float] = None, t1: Optional[float] = None) -> Dict:
+        """sent, recv, loss_pct, min, avg, max and stdev of latency over [t0, t1]."""
+        sent = recv = n = 0
+        total = squares = 0.0
+        mn = mx = None
+        for _, b_sent, b_recv, b_n, b_min, b_max, b_sum, b_sq in self.query(t0, t1):
+            sent += b_sent; recv += b_recv
+            if b_n:
+                n += b_n; total += b_sum; squares += b_sq
+                mn = b_min if mn is None else min(mn, b_min)
+                mx = b_max if mx is None else max(mx, b_max)
+        mean = total / n if n else None
+        stdev = math.sqrt(max(squares / n - mean * mean, 0.0)) if n > 1 else None
+        return {
+            "sent": sent, "recv": recv,
+            "loss_pct": round((sent - recv) / sent * 100.0, 1) if sent else 100.0,
+            "min": mn, "avg": mean, "max": mx, "stdev": stdev,
+        }
+
+    def series(self, t0: Optional[float] = None, t1: Optional[float] = None, max_points: Optional[int] = None) -> Tuple[List[float], List[Optional[float]]]:
+        """(xs, ys): bucket midpoints and mean latency, ys None where nothing answered (for plotting)."""
+        xs: List[float] = []; ys: List[Optional[float]] = []
+        t = self.tier_for(t0, t1, max_points)
+        if t is None:
+            return xs, ys
+        half = t.width / 2.0
+        for start, _, _, n, _, _, total, _ in t.buckets(t0, t1):
+            xs.append(start + half)
+            ys.append(total / n if n else None)
+        return xs, ys
+
+    def clear(self):
+        for t in self.tiers:
+            t.clear()
+        self.first_ts = self.last_ts = None
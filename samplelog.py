@@ -0,0 +1,227 @@
+# samplelog.py
+"""
+Append-only binary log of raw PingSamples.
+
+Each sample is one fixed-width little-endian record (32 bytes): timestamp,
+latency (float64 like the live value, NaN for no reply), host id, sequence
+number, span, TTL and a success flag.  Host names are interned in a sidecar
+text file (<log>.hosts, one name per line, line number = host id), so records
+never carry strings.  Writes are buffered and go to the OS in large chunks
+with no fsync; a crash loses at most the unflushed buffer, and a torn trailing
+record is cut off on the next open.
+
+SampleLogReader maps the file with mmap and exposes it as a NumPy structured
+array that points straight into the mapping, so opening a multi-gigabyte log
+costs nothing up front and columns such as records["latency_ms"] are views,
+not copies.  Replay feeds the records through HostStats chunk by chunk, so a
+past run can be reanalysed (analytics.analyze_fleet) without holding its
+samples in RAM as Python objects.
+"""
+import mmap, os, struct
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+from models import HostStats, PingSample
+from detectors import AlertLog
+
+try:
+    import numpy as np
+except ImportError:  # recording works without numpy; reading needs it
+    np = None
+
+MAGIC = b"ZPSLOG\x00\x02"
+_HEADER = struct.Struct("<8sII")     # magic, record size, reserved
+_RECORD = struct.Struct("<ddIIHBB4x")  # ts, latency, host id, seq, span, ttl, flags, pad to 8-byte alignment
+HEADER_SIZE = _HEADER.size
+RECORD_SIZE = _RECORD.size
+FLAG_SUCCESS = 1
+FLUSH_BYTES = 1 << 16                # 2048 samples per write
+REPLAY_CHUNK = 65536                 # records materialised at a time during replay
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([
+        ("ts", "<f8"), ("latency_ms", "<f8"), ("host", "<u4"), ("seq", "<u4"),
+        ("span", "<u2"), ("ttl", "u1"), ("flags", "u1"), ("_pad", "V4"),
+    ])
+    assert RECORD_DTYPE.itemsize == RECORD_SIZE
+
+
+def _hosts_path(path: str) -> str:
+    return path + ".hosts"
+
+
+def _read_hosts(path: str) -> List[str]:
+    try:
+        with open(_hosts_path(path), "r", encoding="utf-8") as f:
+            return f.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+
+def _check_header(raw: bytes, path: str):
+    magic, size, _ = _HEADER.unpack(raw)
+    if magic[:6] == MAGIC[:6] and (magic != MAGIC or size != RECORD_SIZE):
+        raise ValueError(f"{path}: unsupported ZestyPing sample log version")
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a ZestyPing sample log")
+
+
+class SampleLog:
+    """Buffered appender.  Not thread-safe: feed it from one thread (the UI drains samples on one)."""
+
+    def __init__(self, path: str, flush_bytes: int = FLUSH_BYTES):
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.hosts = _read_hosts(path)
+        self._ids: Dict[str, int] = {h: i for i, h in enumerate(self.hosts)}
+        self._new_hosts: List[str] = []
+        self._buf = bytearray()
+        self.written = 0
+        self._f = open(path, "r+b" if os.path.exists(path) else "w+b")
+        size = self._f.seek(0, os.SEEK_END)
+        if size < HEADER_SIZE:
+            self._f.seek(0); self._f.truncate()
+            self._f.write(_HEADER.pack(MAGIC, RECORD_SIZE, 0))
+        else:
+            self._f.seek(0)
+            _check_header(self._f.read(HEADER_SIZE), path)
+            # Drop a record torn by a crash so every later record stays aligned
+            whole = HEADER_SIZE + (size - HEADER_SIZE) // RECORD_SIZE * RECORD_SIZE
+            if whole != size:
+                self._f.truncate(whole)
+            self._f.seek(whole)
+
+    def _host_id(self, host: str) -> int:
+        i = self._ids.get(host)
+        if i is None:
+            i = self._ids[host] = len(self.hosts)
+            self.hosts.append(host); self._new_hosts.append(host)
+        return i
+
+    def append(self, s: PingSample):
+        lat = s.latency_ms if s.success and s.latency_ms is not None else float("nan")
+        self._buf += _RECORD.pack(s.ts, lat, self._host_id(s.host), s.seq & 0xFFFFFFFF,
+                                  min(s.span, 0xFFFF), s.ttl or 0, FLAG_SUCCESS if s.success else 0)
+        if len(self._buf) >= self.flush_bytes:
+            self.flush()
+
+    def extend(self, samples: Iterable[PingSample]):
+        for s in samples:
+            self.append(s)
+
+    def flush(self):
+        """Hand buffered records to the OS (no fsync)."""
+        if self._new_hosts:
+            # Names first, so every flushed record refers to a host the sidecar already lists
+            with open(_hosts_path(self.path), "a", encoding="utf-8") as f:
+                f.write("".join(h + "\n" for h in self._new_hosts))
+            self._new_hosts.clear()
+        if self._buf:
+            self._f.write(self._buf)
+            self.written += len(self._buf) // RECORD_SIZE
+            self._buf.clear()
+        self._f.flush()
+
+    def close(self):
+        if not self._f.closed:
+            self.flush()
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SampleLogReader:
+    def __init__(self, path: str):
+        if np is None:
+            raise RuntimeError("reading sample logs requires numpy")
+        self.path = path
+        self.hosts = _read_hosts(path)
+        self._f = open(path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        if size < HEADER_SIZE:
+            raise ValueError(f"{path}: not a ZestyPing sample log")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        _check_header(self._mm[:HEADER_SIZE], path)
+        n = (size - HEADER_SIZE) // RECORD_SIZE
+        # Zero-copy: the array's buffer is the mapping itself
+        self.records = np.frombuffer(self._mm, dtype=RECORD_DTYPE, count=n, offset=HEADER_SIZE)
+        self._order = None
+        self.alerts = AlertLog()  # detector alerts raised by replay(), kept out of the live ALERTS log
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _index(self):
+        # Rows grouped by host id (stable, so each host's rows stay in log order) plus group offsets
+        if self._order is None:
+            ids = self.records["host"]
+            self._order = np.argsort(ids, kind="stable")
+            self._starts = np.concatenate(([0], np.cumsum(np.bincount(ids, minlength=len(self.hosts)))))
+        return self._order, self._starts
+
+    def rows(self, host: str):
+        """Record indices of one host, in log order."""
+        try:
+            i = self.hosts.index(host)
+        except ValueError:
+            return np.empty(0, dtype=np.intp)
+        order, starts = self._index()
+        return order[starts[i]:starts[i + 1]] if i + 1 < len(starts) else np.empty(0, dtype=np.intp)
+
+    def for_host(self, host: str):
+        """One host's records (a copy of just those rows)."""
+        return self.records[self.rows(host)]
+
+    def iter_samples(self, hosts: Optional[Sequence[str]] = None, chunk: int = REPLAY_CHUNK) -> Iterator[PingSample]:
+        """PingSamples in log order, built one chunk of records at a time."""
+        recs = self.records
+        if hosts is not None:
+            idx = np.sort(np.concatenate([self.rows(h) for h in hosts] or [np.empty(0, dtype=np.intp)]))
+        names = self.hosts
+        for i in range(0, len(idx) if hosts is not None else len(recs), chunk):
+            part = recs[idx[i:i + chunk]] if hosts is not None else recs[i:i + chunk]
+            for ts, lat, hid, seq, span, ttl, flags, _ in part.tolist():
+                ok = bool(flags & FLAG_SUCCESS)
+                yield PingSample(ts=ts, host=names[hid], success=ok, latency_ms=lat if ok and lat == lat else None,
+                                 ttl=ttl or None, seq=seq, span=span)
+
+    def replay(self, count: int = 60, hosts: Optional[Sequence[str]] = None) -> Dict[str, HostStats]:
+        """
+        Rebuild HostStats for a past run: the window ends on the last `count`
+        samples, while rollups, outages and jitter cover the whole log.
+        Detector alerts go to self.alerts, not to the running UI's ALERTS.
+        """
+        stats: Dict[str, HostStats] = {}
+        for s in self.iter_samples(hosts):
+            st = stats.get(s.host)
+            if st is None:
+                st = stats[s.host] = HostStats(host=s.host, count=count, alerts=self.alerts)
+            st.add(s)
+        return stats
+
+    def close(self):
+        # Views into the mapping must go before it can be closed
+        self.records = None; self._order = None
+        self._mm.close(); self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    import sys
+    from analytics import analyze_fleet
+
+    if len(sys.argv) < 2:
+        sys.exit("usage: python samplelog.py RUN.zlog [window]")
+    with SampleLogReader(sys.argv[1]) as reader:
+        print(f"{len(reader)} samples, {len(reader.hosts)} hosts")
+        stats = reader.replay(count=int(sys.argv[2]) if len(sys.argv) > 2 else 60)
+    for host, r in analyze_fleet(stats.values()).items():
+        mean = "-" if r["mean"] is None else f"{r['mean']:.2f} ms"
+        print(f"{host:<40} loss {r['loss_pct']:5.1f}%  mean {mean:>10}  outages {r['outages']}")
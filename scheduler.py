@@ -0,0 +1,123 @@
+# scheduler.py
+"""
+Central probe scheduler.
+
+A single thread keeps every host's next deadline in one heap and hands due
+probes to a fixed-size thread pool, so the number of threads is capped by
+pool_size no matter how many hosts run, and the scheduler only wakes when a
+probe is actually due.
+"""
+import heapq, itertools, threading, time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from queue import Queue
+from models import PingSample
+from utils import make_pinger
+from dns_cache import ping_resolved
+from ratelimit import RateLimiter, Backoff
+
+
+class ScheduledHost:
+    """
+    One host's probe state inside a ProbeScheduler.
+    Offers the is_alive/stop/join subset of HostWorker so HostManager can
+    treat it like a worker thread.
+    """
+
+    def __init__(self, scheduler: "ProbeScheduler", host: str, interval_s: float, timeout_ms: int, max_count: Optional[int], backoff: Optional[Backoff] = None):
+        self.scheduler = scheduler; self.host = host; self.interval_s = interval_s
+        self.timeout_ms = timeout_ms; self.max_count = max_count; self.backoff = backoff
+        self.seq = 0; self.next_tick = 0.0
+        self.span = 1; self.ticks = 0  # current wait in intervals; intervals covered so far
+        self.stopped = False; self.in_flight = False
+        self.done = threading.Event()
+
+    def is_alive(self) -> bool:
+        return not self.done.is_set()
+
+    def stop(self):
+        self.scheduler.cancel(self)
+
+    def join(self, timeout: Optional[float] = None):
+        self.done.wait(timeout)
+
+
+class ProbeScheduler:
+    def __init__(self, sample_queue: Queue, engine: str = "subprocess", pool_size: int = 16, limiter: Optional[RateLimiter] = None):
+        self.sample_queue = sample_queue; self.engine = engine; self.pool_size = pool_size; self.limiter = limiter
+        self._heap: List[Tuple[float, int, ScheduledHost]] = []
+        self._order = itertools.count()
+        self._cv = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="zestyping-probe")
+        self._local = threading.local()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, host: str, interval_s: float, timeout_ms: int, max_count: Optional[int] = None, start_at: Optional[float] = None, backoff: Optional[Backoff] = None) -> ScheduledHost:
+        job = ScheduledHost(self, host, interval_s, timeout_ms, max_count, backoff)
+        job.next_tick = time.monotonic() if start_at is None else start_at
+        if max_count is not None and max_count <= 0:
+            job.done.set()
+            return job
+        with self._cv:
+            self._push(job)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="zestyping-scheduler", daemon=True)
+                self._thread.start()
+        return job
+
+    def _push(self, job: ScheduledHost):
+        # Caller holds self._cv
+        was_first = not self._heap or job.next_tick < self._heap[0][0]
+        heapq.heappush(self._heap, (job.next_tick, next(self._order), job))
+        if was_first:
+            self._cv.notify()
+
+    def cancel(self, job: ScheduledHost):
+        with self._cv:
+            job.stopped = True
+            if not job.in_flight:
+                job.done.set()  # its heap entry is dropped when it comes due
+
+    def _loop(self):
+        while True:
+            with self._cv:
+                while True:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    self._cv.wait(timeout=(self._heap[0][0] - now) if self._heap else None)
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    job = heapq.heappop(self._heap)[2]
+                    if job.stopped:
+                        continue
+                    job.in_flight = True
+                    due.append(job)
+            for job in due:
+                self._pool.submit(self._probe, job)
+
+    def _pinger(self):
+        # One pinger per pool thread, so icmp sockets are reused but never shared
+        ping = getattr(self._local, "ping", None)
+        if ping is None:
+            ping = self._local.ping = make_pinger(self.engine)
+        return ping
+
+    def _probe(self, job: ScheduledHost):
+        try:
+            with (self.limiter.slot() if self.limiter is not None else nullcontext()):
+                res = ping_resolved(self._pinger(), job.host, job.timeout_ms)
+            self.sample_queue.put(PingSample(ts=time.time(), host=job.host, success=res["success"], latency_ms=res.get("latency_ms"), ip=res.get("ip"), ttl=res.get("ttl"), seq=job.seq, span=job.span))
+            job.seq += 1; job.ticks += job.span
+            if job.backoff is not None:
+                job.span = job.backoff.update(res["success"])
+        finally:
+            with self._cv:
+                job.in_flight = False
+                if job.stopped or (job.max_count is not None and job.ticks >= job.max_count):
+                    job.done.set()
+                else:
+                    job.next_tick += job.interval_s * job.span
+                    self._push(job)
+
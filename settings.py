@@ -1,4 +1,5 @@
 import json, os
+from inventory import Inventory, write_json_atomic
 
 DEFAULTS = {
     "hosts": ["8.8.8.8", "1.1.1.1", "google.com"],
@@ -6,10 +7,24 @@ DEFAULTS = {
     "interval_s": 0.5,
     "timeout_ms": 500,
     "count": 120,
+    "engine": "subprocess",  # "subprocess" (ping per sample), "stream" (one ping per host) or "icmp" (in-process sockets)
+    "manager": "threads",  # "threads" (one thread per host), "asyncio" (one event loop) or "processes" (sharded)
+    "shards": 0,  # processes manager: number of worker processes (0 = one per CPU core)
+    "pool_size": 0,  # threads manager: >0 = one scheduler + this many probe threads (0 = a thread per host)
+    "sweep_min_hosts": 256,  # with the icmp engine, runs this large use one batched sweep (0 = never)
+    "max_pps": 0,  # global probe rate limit in packets/s (0 = unlimited)
+    "max_in_flight": 0,  # global cap on outstanding probes (0 = unlimited)
+    "backoff_after": 0,  # back off a host after this many consecutive losses (0 = never)
+    "backoff_max_s": 30.0,  # longest backed-off probe interval
+    "rollup_hours": 1.0,  # in-memory 1 s / 10 s / 1 min history kept per host beyond the window (~35 KB per host per hour)
+    "sample_log_dir": "",  # record every run's raw samples to <dir>/run-YYYYmmdd-HHMMSS.zlog ("" = off)
+    "history_db": "",  # SQLite history of every sample, e.g. "history.db" (relative to the app folder; "" = off)
+    "load_groups": [],  # descriptions whose hosts are loaded at startup ([] = all hosts)
 }
 
 class Settings:
     PATH = os.path.join(os.path.dirname(__file__), "config.json")
+    INVENTORY_PATH = os.path.join(os.path.dirname(__file__), "inventory.db")
 
     def __init__(
         self,
@@ -18,44 +33,135 @@ class Settings:
         timeout_ms=DEFAULTS["timeout_ms"],
         count=DEFAULTS["count"],
         host_descriptions=None,
+        engine=DEFAULTS["engine"],
+        manager=DEFAULTS["manager"],
+        sweep_min_hosts=DEFAULTS["sweep_min_hosts"],
+        pool_size=DEFAULTS["pool_size"],
+        max_pps=DEFAULTS["max_pps"],
+        max_in_flight=DEFAULTS["max_in_flight"],
+        shards=DEFAULTS["shards"],
+        backoff_after=DEFAULTS["backoff_after"],
+        backoff_max_s=DEFAULTS["backoff_max_s"],
+        load_groups=None,
+        sample_log_dir=DEFAULTS["sample_log_dir"],
+        rollup_hours=DEFAULTS["rollup_hours"],
+        history_db=DEFAULTS["history_db"],
     ):
         self.hosts = hosts if hosts is not None else list(DEFAULTS["hosts"])
         self.interval_s = float(interval_s)
         self.timeout_ms = int(timeout_ms)
         self.count = int(count)
+        self.engine = str(engine)
+        self.manager = str(manager)
+        self.sweep_min_hosts = int(sweep_min_hosts)
+        self.pool_size = int(pool_size)
+        self.max_pps = float(max_pps)
+        self.max_in_flight = int(max_in_flight)
+        self.shards = int(shards)
+        self.backoff_after = int(backoff_after)
+        self.backoff_max_s = float(backoff_max_s)
+        self.sample_log_dir = str(sample_log_dir or "")
+        self.rollup_hours = float(rollup_hours)
+        self.history_db = str(history_db or "")
+        self.load_groups = [str(g) for g in (load_groups or [])]
         # NEW: optional mapping host -> description
         self.host_descriptions = host_descriptions if host_descriptions is not None else {DEFAULTS["hosts"][i]: DEFAULTS["descriptions"][i] for i in range(len(DEFAULTS["hosts"]))}
+        # host -> description as last read from / written to the inventory; save() diffs against it
+        self._loaded = None
 
     @classmethod
     def load(cls):
         try:
             with open(cls.PATH, "r", encoding="utf-8") as f:
                 data = json.load(f)
-            count_val = data.get("count", data.get("window", DEFAULTS["count"]))
-            hosts = data.get("hosts", DEFAULTS["hosts"])
-            host_desc = data.get("host_descriptions", {})
-            return Settings(
-                hosts=hosts,
+        except Exception:
+            data = {}
+        count_val = data.get("count", data.get("window", DEFAULTS["count"]))
+        try:
+            st = Settings(
                 interval_s=data.get("interval_s", DEFAULTS["interval_s"]),
                 timeout_ms=data.get("timeout_ms", DEFAULTS["timeout_ms"]),
                 count=count_val,
-                host_descriptions=host_desc,
+                engine=data.get("engine", DEFAULTS["engine"]),
+                manager=data.get("manager", DEFAULTS["manager"]),
+                sweep_min_hosts=data.get("sweep_min_hosts", DEFAULTS["sweep_min_hosts"]),
+                pool_size=data.get("pool_size", DEFAULTS["pool_size"]),
+                max_pps=data.get("max_pps", DEFAULTS["max_pps"]),
+                max_in_flight=data.get("max_in_flight", DEFAULTS["max_in_flight"]),
+                shards=data.get("shards", DEFAULTS["shards"]),
+                backoff_after=data.get("backoff_after", DEFAULTS["backoff_after"]),
+                backoff_max_s=data.get("backoff_max_s", DEFAULTS["backoff_max_s"]),
+                load_groups=data.get("load_groups", DEFAULTS["load_groups"]),
+                sample_log_dir=data.get("sample_log_dir", DEFAULTS["sample_log_dir"]),
+                rollup_hours=data.get("rollup_hours", DEFAULTS["rollup_hours"]),
+                history_db=data.get("history_db", DEFAULTS["history_db"]),
             )
         except Exception:
-            return Settings()
+            st = Settings()
+        try:
+            inv = Inventory(cls.INVENTORY_PATH)
+        except Exception:
+            # No usable inventory: fall back to the hosts kept in config.json itself
+            if "hosts" in data:
+                st.hosts = list(data["hosts"]); st.host_descriptions = dict(data.get("host_descriptions", {}))
+            return st
+        try:
+            if inv.get_meta("migrated") is None:
+                # First run with an inventory: migrate the hosts of an older config.json (or the
+                # defaults) once; an inventory the user has since emptied stays empty
+                if len(inv) == 0:
+                    hosts = data.get("hosts", st.hosts)
+                    desc = data.get("host_descriptions", st.host_descriptions)
+                    inv.upsert((h, desc.get(h, "")) for h in hosts)
+                inv.set_meta("migrated", "1")
+            groups = st.load_groups
+            rows = inv.load(groups=groups)
+        finally:
+            inv.close()
+        st.hosts = [h for h, _ in rows]
+        st.host_descriptions = dict(rows)
+        st._loaded = dict(rows)
+        return st
+
+    def mark_stored(self, rows):
+        """Record (host, description) pairs already written to the inventory, so save() skips them."""
+        if self._loaded is not None:
+            self._loaded.update(rows)
+
+    def history_path(self):
+        """Absolute path of the history database, or None when history is off."""
+        if not self.history_db:
+            return None
+        return os.path.join(os.path.dirname(self.PATH), self.history_db)
 
     def save(self):
-        # Ensure descriptions only for current hosts
-        desc_map = {h: self.host_descriptions.get(h, "") for h in self.hosts}
-        with open(self.PATH, "w", encoding="utf-8") as f:
-            json.dump(
-                {
-                    "hosts": self.hosts,
-                    "interval_s": self.interval_s,
-                    "timeout_ms": self.timeout_ms,
-                    "count": self.count,
-                    "host_descriptions": desc_map,
-                },
-                f,
-                indent=2,
-            )
+        # Scalars stay in config.json; hosts go to the inventory as row-level changes
+        write_json_atomic(self.PATH, {
+            "interval_s": self.interval_s,
+            "timeout_ms": self.timeout_ms,
+            "count": self.count,
+            "engine": self.engine,
+            "manager": self.manager,
+            "sweep_min_hosts": self.sweep_min_hosts,
+            "pool_size": self.pool_size,
+            "max_pps": self.max_pps,
+            "max_in_flight": self.max_in_flight,
+            "shards": self.shards,
+            "backoff_after": self.backoff_after,
+            "backoff_max_s": self.backoff_max_s,
+            "load_groups": self.load_groups,
+            "sample_log_dir": self.sample_log_dir,
+            "rollup_hours": self.rollup_hours,
+            "history_db": self.history_db,
+        })
+        current = {h: self.host_descriptions.get(h, "") for h in self.hosts}
+        loaded = self._loaded or {}
+        inv = Inventory(self.INVENTORY_PATH)
+        try:
+            # Only hosts this session loaded can have been removed; unloaded groups are left alone
+            inv.remove([h for h in loaded if h not in current])
+            inv.upsert((h, d) for h, d in current.items() if loaded.get(h) != d)
+            inv.set_meta("migrated", "1")  # the inventory is authoritative from now on, even if empty
+        finally:
+            inv.close()
+        self._loaded = current
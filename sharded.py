@@ -0,0 +1,196 @@
+# sharded.py
+"""
+Multi-process host manager.
+
+ShardedHostManager splits the host set across N worker processes, each running
+an ordinary HostManager, so probing, parsing and sample creation happen
+outside the UI interpreter's GIL.  Each shard flushes its samples back in
+batches of compact tuples over a pipe; one receiver thread in the UI process
+turns them back into PingSamples for the shared sample_queue.  Hosts are
+assigned to shards by a stable hash, so stop_host goes straight to the shard
+that owns the host.
+"""
+import itertools, threading, time, zlib
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from queue import Queue
+from typing import Dict, List, Optional, Tuple
+from models import PingSample
+from ratelimit import phase_offsets
+from transport import SampleBuffer
+
+FLUSH_S = 0.05  # how often a shard ships a batch of samples
+
+
+def _shard_main(cmd_conn, out_conn, engine: str, pool_size: int, max_pps: float, max_in_flight: int, backoff_after: int, backoff_max_s: float):
+    """Entry point of a shard process: run a HostManager and stream batches back."""
+    from ping_worker import HostManager
+    q = SampleBuffer()
+    mgr = HostManager(q, engine=engine, pool_size=pool_size, max_pps=max_pps, max_in_flight=max_in_flight, backoff_after=backoff_after, backoff_max_s=backoff_max_s)
+    lock = threading.Lock()
+    gens: Dict[str, int] = {}
+
+    def commands():
+        while True:
+            try:
+                msg = cmd_conn.recv()
+            except (EOFError, OSError):
+                return
+            op = msg[0]
+            with lock:
+                if op == "start":
+                    _, gen, host, interval_s, timeout_ms, max_count, delay = msg
+                    gens[host] = gen
+                    mgr.start_host(host, interval_s, timeout_ms, max_count, start_delay=delay)
+                elif op == "sweep":
+                    _, gen, hosts, interval_s, timeout_ms, max_count = msg
+                    for h in hosts: gens[h] = gen
+                    mgr.start_sweep(hosts, interval_s, timeout_ms, max_count)
+                elif op == "stop":
+                    mgr.stop_host(msg[1])
+                elif op == "stop_all":
+                    mgr.stop_all()
+                elif op == "quit":
+                    return
+
+    t = threading.Thread(target=commands, daemon=True)
+    t.start()
+    last_stats = None
+    try:
+        while t.is_alive():
+            time.sleep(FLUSH_S)
+            rows = [(s.ts, s.host, s.success, s.latency_ms, s.ip, s.ttl, s.seq, s.span) for s in q.drain()]
+            with lock:
+                done = [(h, gens.pop(h, 0)) for h in mgr.cleanup_finished()]
+                stats = mgr.limiter_stats()
+            if rows:
+                out_conn.send(("samples", rows))
+            if done:
+                out_conn.send(("done", done))
+            if stats is not None and stats != last_stats:
+                out_conn.send(("stats", stats)); last_stats = stats
+    except (BrokenPipeError, EOFError, OSError):
+        pass
+    finally:
+        mgr.stop_all()
+
+
+class ShardedHostManager:
+    """Same API as ping_worker.HostManager, with hosts spread over `shards` processes."""
+
+    def __init__(self, sample_queue: Queue, engine: str = "subprocess", shards: int = 2, pool_size: int = 0, max_pps: float = 0.0, max_in_flight: int = 0, backoff_after: int = 0, backoff_max_s: float = 30.0):
+        self.sample_queue = sample_queue; self.engine = engine
+        self.shards = max(1, int(shards))
+        self._lock = threading.Lock()
+        self._gen = itertools.count(1)
+        self._running: Dict[str, int] = {}  # host -> generation of its current start
+        self._finished: List[str] = []
+        self._stats: Dict[int, Dict] = {}
+        self._cmd = []; self._out = []; self._procs = []
+        # The global limits are split evenly so the fleet-wide totals still hold
+        per_pps = max_pps / self.shards if max_pps else 0.0
+        per_flight = -(-max_in_flight // self.shards) if max_in_flight else 0
+        for _ in range(self.shards):
+            cmd_r, cmd_w = mp.Pipe(duplex=False)
+            out_r, out_w = mp.Pipe(duplex=False)
+            p = mp.Process(target=_shard_main, args=(cmd_r, out_w, engine, pool_size, per_pps, per_flight, backoff_after, backoff_max_s), daemon=True)
+            p.start()
+            cmd_r.close(); out_w.close()
+            self._cmd.append(cmd_w); self._out.append(out_r); self._procs.append(p)
+        self._receiver = threading.Thread(target=self._receive, name="zestyping-shards", daemon=True)
+        self._receiver.start()
+
+    def shard_of(self, host: str) -> int:
+        return zlib.crc32(host.encode("utf-8")) % self.shards
+
+    def _send(self, shard: int, msg: Tuple):
+        try:
+            self._cmd[shard].send(msg)
+        except (BrokenPipeError, OSError):
+            pass
+
+    def _receive(self):
+        conns = list(self._out)
+        while conns:
+            for conn in wait(conns):
+                try:
+                    kind, payload = conn.recv()
+                except (EOFError, OSError):
+                    conns.remove(conn)
+                    continue
+                if kind == "samples":
+                    samples = [PingSample(ts=ts, host=host, success=success, latency_ms=lat, ip=ip, ttl=ttl, seq=seq, span=span)
+                               for ts, host, success, lat, ip, ttl, seq, span in payload]
+                    put_many = getattr(self.sample_queue, "put_many", None)
+                    if put_many is not None:
+                        put_many(samples)
+                    else:
+                        for s in samples: self.sample_queue.put(s)
+                elif kind == "done":
+                    with self._lock:
+                        for host, gen in payload:
+                            if self._running.get(host) == gen:  # ignore reports about an earlier run
+                                del self._running[host]
+                                self._finished.append(host)
+                elif kind == "stats":
+                    self._stats[self._out.index(conn)] = payload
+
+    def start_host(self, host: str, interval_s: float, timeout_ms: int, max_count: Optional[int] = None, start_delay: float = 0.0):
+        with self._lock:
+            if host in self._running: return
+            gen = self._running[host] = next(self._gen)
+        self._send(self.shard_of(host), ("start", gen, host, interval_s, timeout_ms, max_count, start_delay))
+
+    def start_hosts(self, hosts: List[str], interval_s: float, timeout_ms: int, max_count: Optional[int] = None):
+        for h, delay in zip(hosts, phase_offsets(len(hosts), interval_s)):
+            self.start_host(h, interval_s, timeout_ms, max_count, start_delay=delay)
+
+    def start_sweep(self, hosts: List[str], interval_s: float, timeout_ms: int, max_count: Optional[int] = None):
+        """One sweep per shard, each covering the hosts that shard owns."""
+        by_shard: Dict[int, List[str]] = {}
+        with self._lock:
+            gen = next(self._gen)
+            for h in dict.fromkeys(hosts):
+                if h in self._running: continue
+                self._running[h] = gen
+                by_shard.setdefault(self.shard_of(h), []).append(h)
+        for shard, group in by_shard.items():
+            self._send(shard, ("sweep", gen, group, interval_s, timeout_ms, max_count))
+
+    def stop_host(self, host: str):
+        with self._lock:
+            if self._running.pop(host, None) is None: return
+        self._send(self.shard_of(host), ("stop", host))
+
+    def stop_all(self):
+        with self._lock:
+            self._running.clear()
+        for shard in range(self.shards):
+            self._send(shard, ("stop_all",))
+
+    def cleanup_finished(self) -> List[str]:
+        with self._lock:
+            dead, self._finished = self._finished, []
+        return dead
+
+    def running_hosts(self):
+        with self._lock:
+            return list(self._running)
+
+    def limiter_stats(self) -> Optional[Dict]:
+        stats = list(self._stats.values())
+        if not stats:
+            return None
+        delayed = sum(s["delayed"] for s in stats)
+        return {
+            "probes": sum(s["probes"] for s in stats),
+            "delayed": delayed,
+            "mean_lag_ms": round(sum(s["mean_lag_ms"] * s["delayed"] for s in stats) / delayed, 1) if delayed else 0.0,
+            "max_lag_ms": max(s["max_lag_ms"] for s in stats),
+        }
+
+    def close(self):
+        for shard in range(self.shards):
+            self._send(shard, ("quit",))
+        for p in self._procs:
+            p.join(timeout=1.5)
@@ -0,0 +1,111 @@
+# sketch.py
+"""
+Mergeable latency quantile sketch.
+
+LatencySketch is a log-bucketed histogram (the DDSketch / HDR idea): a value v
+lands in bucket ceil(log_gamma(v)), and every bucket is reported as the one
+value that is within `alpha` relative error of everything in it.  Memory is
+bounded by the span of latencies seen, not by the number of samples (1 µs to
+100 s at 1 % error is under 1000 buckets), buckets can be decremented so a
+sketch can follow a sliding window, and two sketches merge by adding counts.
+"""
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+ALPHA = 0.01            # relative accuracy of reported quantiles
+MIN_MS = 0.001          # values below this are counted as 0 ms
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class LatencySketch:
+    __slots__ = ("alpha", "gamma", "_log_gamma", "counts", "zeros", "n")
+
+    def __init__(self, alpha: float = ALPHA):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.counts: Dict[int, int] = {}
+        self.zeros = 0
+        self.n = 0
+
+    def _key(self, v: float) -> int:
+        return math.ceil(math.log(v) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        return 2.0 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, v: float, count: int = 1):
+        if v < MIN_MS:
+            self.zeros += count
+        else:
+            k = self._key(v)
+            self.counts[k] = self.counts.get(k, 0) + count
+        self.n += count
+
+    def remove(self, v: float):
+        """Undo one add(v), e.g. when a sample leaves the window."""
+        if v < MIN_MS:
+            self.zeros -= 1
+        else:
+            k = self._key(v)
+            left = self.counts[k] - 1
+            if left:
+                self.counts[k] = left
+            else:
+                del self.counts[k]
+        self.n -= 1
+
+    def clear(self):
+        self.counts.clear(); self.zeros = 0; self.n = 0
+
+    def merge(self, other: "LatencySketch"):
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for k, c in other.counts.items():
+            self.counts[k] = self.counts.get(k, 0) + c
+        self.zeros += other.zeros
+        self.n += other.n
+
+    def to_bytes(self) -> bytes:
+        """Compact encoding for storage: zeros, then (bucket, count) pairs."""
+        flat = array("q", [self.zeros])
+        for k, c in self.counts.items():
+            flat.append(k); flat.append(c)
+        return flat.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, alpha: float = ALPHA) -> "LatencySketch":
+        flat = array("q"); flat.frombytes(data)
+        sk = cls(alpha)
+        sk.zeros = flat[0] if flat else 0
+        sk.counts = dict(zip(flat[1::2], flat[2::2]))
+        sk.n = sk.zeros + sum(sk.counts.values())
+        return sk
+
+    def quantiles(self, qs: Sequence[float] = PERCENTILES) -> List[Optional[float]]:
+        """Estimated latency in ms at each quantile in qs (0..1); None when empty."""
+        if not self.n:
+            return [None] * len(qs)
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        out: List[Optional[float]] = [None] * len(qs)
+        keys = iter(sorted(self.counts))
+        seen = self.zeros; key = None
+        for i in order:
+            rank = qs[i] * (self.n - 1)
+            while seen <= rank:
+                key = next(keys)
+                seen += self.counts[key]
+            out[i] = 0.0 if key is None else round(self._value(key), 3)
+        return out
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles((q,))[0]
+
+
+def merged(sketches: Iterable[LatencySketch], alpha: float = ALPHA) -> LatencySketch:
+    """One sketch covering all of `sketches`, e.g. fleet-wide percentiles."""
+    out = LatencySketch(alpha)
+    for sk in sketches:
+        out.merge(sk)
+    return out
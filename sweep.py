@@ -0,0 +1,160 @@
+# sweep.py
+"""
+fping-style batched sweeps.
+
+One SweepWorker thread owns one ICMP socket per address family and, every
+interval, fires an echo request at every target before waiting for replies.
+Replies are matched back to targets by (source ip, sequence number); the echo
+identifier is fixed per socket (see icmp.IcmpSocket).  Each round emits exactly
+one PingSample per host, so a 4096-host subnet costs one timer and a handful of
+select() wakeups per interval instead of 4096 independent workers.
+"""
+import select, threading, time
+from time import perf_counter_ns
+from typing import Dict, Iterable, List, Optional, Tuple
+from queue import Queue
+from models import PingSample
+import icmp
+from dns_cache import DNS_CACHE
+from ratelimit import RateLimiter, Backoff, make_backoff
+
+DRAIN_EVERY = 64  # sends between non-blocking reads during a round
+
+
+class SweepWorker(threading.Thread):
+    def __init__(self, hosts: Iterable[str], interval_s: float, timeout_ms: int, max_count: Optional[int], sample_queue: Queue, stop_event: threading.Event, limiter: Optional[RateLimiter] = None, backoff_after: int = 0, backoff_max_s: float = 30.0):
+        super().__init__(daemon=True)
+        self.interval_s = interval_s; self.timeout_ms = timeout_ms; self.max_count = max_count
+        self.sample_queue = sample_queue; self.stop_event = stop_event; self.limiter = limiter
+        self.seqs: Dict[str, int] = dict.fromkeys(hosts, 0)  # ordered host set -> next seq
+        # Adaptive backoff: a backed-off host sits out rounds until next_round[host]
+        self.backoff_after = backoff_after; self.backoff_max_s = backoff_max_s
+        self.backoffs: Dict[str, Backoff] = {}
+        self.next_round: Dict[str, int] = {}
+        self.spans: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._socks: Dict[int, icmp.IcmpSocket] = {}
+
+    def discard(self, host: str) -> bool:
+        """Stop sweeping one host.  Returns True while other hosts remain in this sweep."""
+        with self._lock:
+            self.seqs.pop(host, None)
+            return bool(self.seqs)
+
+    def _sock(self, family: int) -> icmp.IcmpSocket:
+        s = self._socks.get(family)
+        if s is None:
+            s = self._socks[family] = icmp.IcmpSocket(family)
+        return s
+
+    def _address(self, host: str) -> Optional[Tuple[int, str]]:
+        ip = DNS_CACHE.resolve(host)
+        return icmp.parse_literal(ip) if ip else None
+
+    def _drain(self, pending: Dict[Tuple[str, int], List[str]], sent_at: Dict[Tuple[str, int], int], results: Dict[str, Dict]):
+        """Non-blocking read of every queued reply on every socket."""
+        for s in self._socks.values():
+            while True:
+                try:
+                    got = s.recv()
+                except OSError:  # BlockingIOError once drained
+                    break
+                if got is None:
+                    continue
+                src, seq, ttl, recv_ns = got
+                key = (src, seq)
+                hosts = pending.pop(key, None)
+                if hosts is None:
+                    continue  # late reply from an earlier round, or a duplicate
+                res = {"success": True, "latency_ms": round((recv_ns - sent_at[key]) / 1e6, 3), "ip": src, "ttl": ttl, "recv_ns": recv_ns}
+                for h in hosts:
+                    results[h] = res
+
+    def _collect(self, pending: Dict[Tuple[str, int], List[str]], sent_at: Dict[Tuple[str, int], int], results: Dict[str, Dict], timeout_s: float):
+        """Wait for replies until pending is empty or timeout_s elapses."""
+        socks = [s.sock for s in self._socks.values()]
+        deadline = perf_counter_ns() + int(timeout_s * 1e9)
+        while pending:
+            remaining = (deadline - perf_counter_ns()) / 1e9
+            if remaining <= 0:
+                return
+            ready, _, _ = select.select(socks, [], [], remaining)
+            if not ready:
+                return
+            self._drain(pending, sent_at, results)
+
+    def _send(self, s: icmp.IcmpSocket, ip: str, seq: int) -> Optional[int]:
+        if self.limiter is not None:
+            self.limiter.wait()  # paces the burst; the whole round is in flight at once, so no slot cap
+        while True:
+            try:
+                return s.send(ip, seq)
+            except (BlockingIOError, InterruptedError):
+                # Send buffer full: wait for room rather than dropping the probe.
+                select.select([], [s.sock], [], 0.05)
+            except OSError:
+                return None
+
+    def _round(self, seq: int, round_no: int) -> int:
+        with self._lock:
+            total = len(self.seqs)
+            hosts = [h for h in self.seqs if self.next_round.get(h, 0) <= round_no]
+        wall0 = time.time(); perf0 = perf_counter_ns()
+        pending: Dict[Tuple[str, int], List[str]] = {}
+        sent_at: Dict[Tuple[str, int], int] = {}
+        results: Dict[str, Dict] = {}
+        addrs: Dict[str, Optional[Tuple[int, str]]] = {}
+        for h in hosts:
+            target = addrs[h] = self._address(h)
+            if target is None:
+                continue
+            family, ip = target
+            key = (ip, seq)
+            if key in pending:
+                pending[key].append(h)  # e.g. "localhost" and "127.0.0.1": one probe serves both
+                continue
+            try:
+                s = self._sock(family)
+            except OSError:
+                continue
+            t = self._send(s, ip, seq)
+            if t is None:
+                continue
+            pending[key] = [h]; sent_at[key] = t
+            if len(sent_at) % DRAIN_EVERY == 0:
+                # Early replies arrive while we are still sending; keep the receive queue short.
+                self._drain(pending, sent_at, results)
+        self._collect(pending, sent_at, results, self.timeout_ms / 1000)
+        end_ns = perf_counter_ns()
+        with self._lock:
+            for h in hosts:
+                if h not in self.seqs:
+                    continue
+                res = results.get(h)
+                span = self.spans.get(h, 1)
+                if res is None:
+                    target = addrs.get(h)
+                    self.sample_queue.put(PingSample(ts=wall0 + (end_ns - perf0) / 1e9, host=h, success=False, ip=target[1] if target else None, seq=self.seqs[h], span=span))
+                else:
+                    self.sample_queue.put(PingSample(ts=wall0 + (res["recv_ns"] - perf0) / 1e9, host=h, success=True, latency_ms=res["latency_ms"], ip=res["ip"], ttl=res["ttl"], seq=self.seqs[h], span=span))
+                self.seqs[h] += 1
+                if self.backoff_after > 0:
+                    b = self.backoffs.get(h)
+                    if b is None:
+                        b = self.backoffs[h] = make_backoff(self.interval_s, self.backoff_after, self.backoff_max_s)
+                    span = self.spans[h] = b.update(res is not None)
+                    self.next_round[h] = round_no + span
+        return total
+
+    def run(self):
+        rounds = 0; seq = 0; next_tick = time.time()
+        try:
+            while not self.stop_event.is_set():
+                if self.max_count is not None and rounds >= self.max_count: break
+                if not self._round(seq, rounds): break
+                rounds += 1; seq = (seq + 1) & 0xFFFF
+                next_tick += self.interval_s; self.stop_event.wait(timeout=max(0, next_tick - time.time()))
+        finally:
+            for s in self._socks.values():
+                s.close()
+
@@ -0,0 +1,58 @@
+# transport.py
+"""
+Batched hand-off of samples from probe workers to the UI.
+
+SampleBuffer replaces the queue.Queue between workers and MultiPingApp.
+Workers still call put() (or put_many() for a whole batch); the UI takes
+everything accumulated since its last tick with a single drain(), which swaps
+the pending buffer for a fresh one under one short lock instead of paying a
+lock round-trip per sample.  The buffer is bounded: if the UI falls behind,
+the oldest pending samples are dropped and counted.  Listeners (e.g. the
+history writer) get every drained batch as well, outside the lock.
+"""
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List
+
+MAX_PENDING = 200_000
+
+
+class SampleBuffer:
+    def __init__(self, max_pending: int = MAX_PENDING):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._buf: Deque = deque(maxlen=max_pending)
+        self.delivered = 0
+        self.dropped = 0
+        self.listeners: List[Callable[[Deque], None]] = []
+
+    def put(self, sample) -> None:
+        with self._lock:
+            if len(self._buf) == self.max_pending:
+                self.dropped += 1
+            self._buf.append(sample)
+
+    def put_many(self, samples: Iterable) -> None:
+        samples = list(samples)
+        with self._lock:
+            overflow = len(self._buf) + len(samples) - self.max_pending
+            if overflow > 0:
+                self.dropped += overflow
+            self._buf.extend(samples)
+
+    def drain(self) -> Deque:
+        """Take every pending sample, oldest first."""
+        with self._lock:
+            batch, self._buf = self._buf, deque(maxlen=self.max_pending)
+            self.delivered += len(batch)
+        if batch:
+            for fn in list(self.listeners):
+                fn(batch)
+        return batch
+
+    def qsize(self) -> int:
+        return len(self._buf)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"delivered": self.delivered, "dropped": self.dropped, "pending": len(self._buf)}
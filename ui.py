@@ -1,4 +1,7 @@
+import io
+import json
 import os
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkinter import filedialog
@@ -10,19 +13,31 @@ from matplotlib.figure import Figure
 import matplotlib.dates as mdates
 import webbrowser
 
-from models import HostStats, PingSample
+from models import HostStats
+from sketch import merged
+from detectors import ALERTS, Alert
+from correlation import BUCKET_S, OutageCorrelator
 from settings import Settings
+from inventory import Inventory
+from samplelog import SampleLog
+from history import HistoryWriter
 from ping_worker import HostManager
-from host_input import parse_hosts
+from host_input import TargetSet, count_hosts, parse_hosts
 
 INTERVAL_PRESETS = [0.1, 0.2, 0.5, 1.0, 2.0]  # seconds
 TIMEOUT_PRESETS_MS = [100, 200, 300, 500, 1000, 1500, 2000]
+# Plot range choices: label -> seconds back from now (None = raw window, 0 = whole run)
+PLOT_RANGES = {"Window": None, "15 min": 900, "1 h": 3600, "6 h": 21600, "24 h": 86400, "Whole run": 0}
+PLOT_MAX_POINTS = 600
+MAX_ALERT_LINES = 200
+BULK_LIMIT = 10000  # hosts added per bulk operation
+CSV_CHUNK_ROWS = 200  # CSV import progress granularity
 APP_NAME = "ZestyPing"
 APP_VERSION = "0.2.1"
 
 
 class MultiPingApp(tk.Tk):
-    def __init__(self, settings: Settings, host_manager: HostManager, sample_queue):
+    def __init__(self, settings: Settings, host_manager: HostManager, sample_queue, history: Optional[HistoryWriter] = None):
         super().__init__()
 
         try:
@@ -47,9 +62,14 @@ class MultiPingApp(tk.Tk):
             
         self.title(f"{APP_NAME} v{APP_VERSION}")
         self.geometry("1000x680")
-        # --- Menu bar with Help -> About ---
+        # --- Menu bar: File -> import/export hosts JSON, Help -> About ---
         menubar = tk.Menu(self)
 
+        file_menu = tk.Menu(menubar, tearoff=0)
+        file_menu.add_command(label="Import Hosts JSON…", command=self._import_hosts_json)
+        file_menu.add_command(label="Export Hosts JSON…", command=self._export_hosts_json)
+        menubar.add_cascade(label="File", menu=file_menu)
+
         help_menu = tk.Menu(menubar, tearoff=0)
         help_menu.add_command(label=f"About {APP_NAME}", command=self._show_about)
         menubar.add_cascade(label="Help", menu=help_menu)
@@ -60,8 +80,12 @@ class MultiPingApp(tk.Tk):
         self.settings = settings
         self.host_manager = host_manager
         self.sample_queue = sample_queue
+        self.history = history
 
         self.stats: Dict[str, HostStats] = {}
+        self.targets = TargetSet()  # hosts in the list, as integer ranges for fast "already monitored?" checks
+        self.correlator = OutageCorrelator()
+        self.recorder: Optional[SampleLog] = None
         self.test_active = False
         self.summary_shown = False
 
@@ -121,6 +145,12 @@ class MultiPingApp(tk.Tk):
         ttk.Button(ctrl, text="Stop", command=self._stop).grid(row=0, column=11, padx=(4, 8))
         ttk.Button(ctrl, text="Save Settings", command=self._save_settings).grid(row=0, column=12, padx=(4, 8))
 
+        # Status line (rate limiter lag etc.)
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(ctrl, textvariable=self.status_var, foreground="#555555").grid(
+            row=1, column=0, columnspan=13, sticky="w", pady=(4, 0)
+        )
+
         hosts_frame = ttk.LabelFrame(self, text="Hosts")
         hosts_frame.pack(side=tk.LEFT, fill=tk.Y, padx=8, pady=6)
         self.host_list = tk.Listbox(hosts_frame, height=20, selectmode=tk.EXTENDED)
@@ -155,7 +185,7 @@ class MultiPingApp(tk.Tk):
 
         table_frame = ttk.LabelFrame(right, text="Summary (Live)")
         table_frame.pack(side=tk.TOP, fill=tk.X)
-        cols = ("Host", "Desc", "IP", "Last", "Min", "Avg", "Max", "Loss%", "Recv", "Sent", "LastSeen")
+        cols = ("Host", "Desc", "IP", "Last", "Min", "Avg", "Max", "P50", "P95", "P99", "Jitter", "MOS", "Loss%", "Recv", "Sent", "LastSeen")
         self.table = ttk.Treeview(table_frame, columns=cols, show="headings", height=10)
         for c in cols:
             self.table.heading(c, text=c)
@@ -164,6 +194,13 @@ class MultiPingApp(tk.Tk):
 
         plot_frame = ttk.LabelFrame(right, text="Live Latency (ms)")
         plot_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True, pady=(6, 0))
+        range_bar = ttk.Frame(plot_frame)
+        range_bar.pack(side=tk.TOP, fill=tk.X, padx=6, pady=(4, 0))
+        ttk.Label(range_bar, text="Range:").pack(side=tk.LEFT)
+        self.plot_range = tk.StringVar(value="Window")
+        range_combo = ttk.Combobox(range_bar, values=list(PLOT_RANGES), textvariable=self.plot_range, state="readonly", width=10)
+        range_combo.pack(side=tk.LEFT, padx=(4, 0))
+        range_combo.bind("<<ComboboxSelected>>", lambda e: self._refresh_plot())
         self.fig = Figure(figsize=(6, 4), dpi=100)
         self.ax = self.fig.add_subplot(111)
         self.ax.set_xlabel("Time (HH:MM:SS)")
@@ -172,6 +209,11 @@ class MultiPingApp(tk.Tk):
         self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
+        alerts_frame = ttk.LabelFrame(right, text="Alerts")
+        alerts_frame.pack(side=tk.TOP, fill=tk.X, pady=(6, 0))
+        self.alert_list = tk.Listbox(alerts_frame, height=4)
+        self.alert_list.pack(fill=tk.X, padx=6, pady=6)
+
         # initialize dropdowns from settings
         self._init_interval_controls()
         self._init_timeout_controls()
@@ -231,6 +273,7 @@ class MultiPingApp(tk.Tk):
 
     def _load_from_settings(self):
         self.host_list.delete(0, tk.END)
+        self.targets = TargetSet(self.settings.hosts)
         for h in self.settings.hosts:
             self.host_list.insert(tk.END, h)
             desc = self.settings.host_descriptions.get(h, "")
@@ -242,7 +285,7 @@ class MultiPingApp(tk.Tk):
         h = self.new_host_var.get().strip()
         if not h:
             return
-        if h in self.stats:
+        if h in self.stats or h in self.targets:
             messagebox.showinfo("Host exists", f"{h} already in list.")
             return
 
@@ -251,6 +294,7 @@ class MultiPingApp(tk.Tk):
         desc = desc_raw[:20]
 
         self.host_list.insert(tk.END, h)
+        self.targets.add(h)
         self.stats[h] = HostStats(
             host=h,
             count=int(self.count_var.get() or 60),
@@ -270,6 +314,7 @@ class MultiPingApp(tk.Tk):
             self.host_manager.stop_host(h)
             if h in self.stats:
                 del self.stats[h]
+            self.targets.discard(h)
         for i in reversed(sel):
             self.host_list.delete(i)
         self._refresh_table()
@@ -306,30 +351,49 @@ class MultiPingApp(tk.Tk):
         status = tk.StringVar(value="")
         ttk.Label(win, textvariable=status).pack(anchor="w", padx=8, pady=(0, 6))
 
+        def truncation_note(total):
+            return f" Only the first {BULK_LIMIT} of {total} were taken." if total > BULK_LIMIT else ""
+
+        def preview(_event=None):
+            # count_hosts never expands ranges, so even a /8 previews instantly
+            text = txt.get("1.0", tk.END)
+            total = count_hosts(text)
+            fresh = count_hosts(text, exclude=self.targets)
+            status.set(f"Text expands to {total} unique host(s), {fresh} not yet monitored.{truncation_note(fresh)}")
+
+        txt.bind("<KeyRelease>", preview)
+
         btns = ttk.Frame(win)
         btns.pack(fill=tk.X, padx=8, pady=(0, 8))
 
         def do_add_from_text():
-            hosts = parse_hosts(txt.get("1.0", tk.END), limit=10000)
-            already = set(self.stats.keys())
-            added = 0
+            text = txt.get("1.0", tk.END)
+            # Already-monitored hosts are subtracted range by range, before anything is expanded
+            total = count_hosts(text)
+            fresh = count_hosts(text, exclude=self.targets)
+            hosts = parse_hosts(text, limit=BULK_LIMIT, exclude=self.targets)
             for h in hosts:
-                if h not in already:
-                    self.host_list.insert(tk.END, h)
-                    # no description for text bulk-add, keep as empty string
-                    self.stats[h] = HostStats(
-                        host=h,
-                        count=int(self.count_var.get() or 60),
-                        description="",
-                    )
-                    already.add(h)
-                    added += 1
+                self.host_list.insert(tk.END, h)
+                # no description for text bulk-add, keep as empty string
+                self.stats[h] = HostStats(
+                    host=h,
+                    count=int(self.count_var.get() or 60),
+                    description="",
+                )
+                self.targets.add(h)
             status.set(
-                f"Text: parsed {len(hosts)} host(s). "
-                f"Added {added}, {len(hosts) - added} skipped (duplicates)."
+                f"Text: parsed {total} host(s). "
+                f"Added {len(hosts)}, {total - fresh} skipped (duplicates)."
+                + truncation_note(fresh)
             )
             self._refresh_table()
 
+        progress = ttk.Progressbar(win, mode="determinate", maximum=1.0)
+        cancel_event = threading.Event()
+        # Closing the dialog (Close button or window manager) stops a running import;
+        # <Destroy> also fires for every child widget, so only react to the dialog itself
+        win.bind("<Destroy>", lambda e: cancel_event.set() if e.widget is win else None, add="+")
+
         def import_csv():
             path = filedialog.askopenfilename(
                 title="Import Hosts from CSV",
@@ -338,20 +402,32 @@ class MultiPingApp(tk.Tk):
             if not path:
                 return
 
-            total_rows = 0
-            total_parsed = 0
-            total_added = 0
-            already = set(self.stats.keys())
-
             try:
                 with open(path, newline="", encoding="utf-8") as f:
-                    reader = csv.reader(f)
-                    for row in reader:
+                    data = f.read()
+            except Exception as e:
+                messagebox.showerror("CSV Import Failed", str(e))
+                return
+
+            # Rows are parsed and expanded off the Tk thread, in chunks; the
+            # results land in the Listbox and self.stats in one batch at the end.
+            job = {"done": 0, "total": max(1, data.count("\n") + 1), "rows": 0, "parsed": 0,
+                   "found": [], "error": None, "finished": False}
+            seen = self.targets.copy()  # snapshot; the worker never touches live UI state
+            cancel_event.clear()
+
+            def worker():
+                try:
+                    for n, row in enumerate(csv.reader(io.StringIO(data, newline="")), 1):
+                        if cancel_event.is_set():
+                            break
+                        if n % CSV_CHUNK_ROWS == 0:
+                            job["done"] = n
                         # Skip empty rows
                         if not row or all(not (c or "").strip() for c in row):
                             continue
 
-                        total_rows += 1
+                        job["rows"] += 1
                         host_expr = (row[0] or "").strip()
                         if not host_expr:
                             continue
@@ -359,29 +435,47 @@ class MultiPingApp(tk.Tk):
                         desc_raw = (row[1] if len(row) > 1 else "").strip()
                         desc = desc_raw[:20]  # clamp to 20 chars
 
-                        hosts = parse_hosts(host_expr, limit=10000)
-                        if not hosts:
-                            continue
-
-                        total_parsed += len(hosts)
-                        for h in hosts:
-                            if h not in already:
-                                self.host_list.insert(tk.END, h)
-                                self.stats[h] = HostStats(
-                                    host=h,
-                                    count=int(self.count_var.get() or 60),
-                                    description=desc,
-                                )
-                                already.add(h)
-                                total_added += 1
-
+                        job["parsed"] += count_hosts(host_expr)
+                        for h in parse_hosts(host_expr, limit=BULK_LIMIT, exclude=seen):
+                            job["found"].append((h, desc))
+                            seen.add(h)
+                except Exception as e:
+                    job["error"] = e
+                job["finished"] = True
+
+            def poll():
+                progress["value"] = job["done"] / job["total"]
+                if not job["finished"]:
+                    status.set(f"CSV: {job['rows']} rows, {len(job['found'])} new hosts so far…")
+                    win.after(100, poll)
+                    return
+                progress.pack_forget(); cancel_btn.pack_forget()
+                import_btn.configure(state="normal")
+                if job["error"] is not None:
+                    messagebox.showerror("CSV Import Failed", str(job["error"]))
+                    return
+                if cancel_event.is_set():
+                    status.set(f"CSV: import cancelled after {job['rows']} rows; nothing added.")
+                    return
+                # Hosts added elsewhere while the worker ran are dropped here
+                found = [(h, d) for h, d in job["found"] if h not in self.stats]
+                count = int(self.count_var.get() or 60)
+                if found:
+                    self.host_list.insert(tk.END, *(h for h, _ in found))
+                    self.stats.update((h, HostStats(host=h, count=count, description=d)) for h, d in found)
+                    self.targets = self.targets | TargetSet(h for h, _ in found)
                 status.set(
-                    f"CSV: rows={total_rows}, hosts expanded={total_parsed}, "
-                    f"added={total_added}, skipped={total_parsed - total_added} (duplicates)."
+                    f"CSV: rows={job['rows']}, hosts expanded={job['parsed']}, "
+                    f"added={len(found)}, skipped={job['parsed'] - len(found)} (duplicates)."
                 )
                 self._refresh_table()
-            except Exception as e:
-                messagebox.showerror("CSV Import Failed", str(e))
+
+            import_btn.configure(state="disabled")
+            progress["value"] = 0.0
+            progress.pack(fill=tk.X, padx=8, pady=(0, 6), before=btns)
+            cancel_btn.pack(side=tk.LEFT, padx=(0, 4))
+            threading.Thread(target=worker, name="zestyping-csv-import", daemon=True).start()
+            win.after(100, poll)
 
         def save_template():
             path = filedialog.asksaveasfilename(
@@ -405,22 +499,24 @@ class MultiPingApp(tk.Tk):
 
         # Buttons: text add, CSV import, template, close
         ttk.Button(btns, text="Add from Text", command=do_add_from_text).pack(side=tk.LEFT, padx=(0, 4))
-        ttk.Button(btns, text="Import CSV…", command=import_csv).pack(side=tk.LEFT, padx=(0, 4))
+        import_btn = ttk.Button(btns, text="Import CSV…", command=import_csv)
+        import_btn.pack(side=tk.LEFT, padx=(0, 4))
+        cancel_btn = ttk.Button(btns, text="Cancel Import", command=cancel_event.set)
         ttk.Button(btns, text="Save CSV Template…", command=save_template).pack(side=tk.LEFT, padx=(0, 4))
         ttk.Button(btns, text="Close", command=win.destroy).pack(side=tk.RIGHT)
 
         def do_add():
-            hosts = parse_hosts(txt.get("1.0", tk.END), limit=10000)
-            already = set(self.stats.keys())
-            added = 0
+            text = txt.get("1.0", tk.END)
+            total = count_hosts(text)
+            fresh = count_hosts(text, exclude=self.targets)
+            hosts = parse_hosts(text, limit=BULK_LIMIT, exclude=self.targets)
             for h in hosts:
-                if h not in already:
-                    self.host_list.insert(tk.END, h)
-                    self.stats[h] = HostStats(host=h, count=int(self.count_var.get() or 60))
-                    already.add(h)
-                    added += 1
+                self.host_list.insert(tk.END, h)
+                self.stats[h] = HostStats(host=h, count=int(self.count_var.get() or 60))
+                self.targets.add(h)
             status.set(
-                f"Parsed {len(hosts)} host(s). Added {added}, {len(hosts) - added} skipped (duplicates)."
+                f"Parsed {total} host(s). Added {len(hosts)}, {total - fresh} skipped (duplicates)."
+                + truncation_note(fresh)
             )
             self._refresh_table()
 
@@ -456,16 +552,36 @@ class MultiPingApp(tk.Tk):
 
         self.summary_shown = False
         self.test_active = True
-        for h in hosts:
-            self.host_manager.start_host(
-                h,
+        # Buckets must span a full interval so every host reports once per bucket
+        self.correlator = OutageCorrelator(bucket_s=max(BUCKET_S, interval_s))
+        self._close_recorder()
+        if self.settings.sample_log_dir:
+            try:
+                os.makedirs(self.settings.sample_log_dir, exist_ok=True)
+                self.recorder = SampleLog(os.path.join(self.settings.sample_log_dir, time.strftime("run-%Y%m%d-%H%M%S.zlog")))
+            except OSError as e:
+                messagebox.showwarning("Recording disabled", f"Cannot open sample log: {e}")
+        sweep_min = self.settings.sweep_min_hosts
+        if sweep_min and len(hosts) >= sweep_min:
+            # Large target sets: one socket, one timer, one batched round per interval
+            self.host_manager.start_sweep(
+                hosts,
                 interval_s=interval_s,
                 timeout_ms=timeout_ms,
                 max_count=count,
             )
+            return
+        # Spread first probes across the interval so hosts don't fire (and stay) in phase
+        self.host_manager.start_hosts(
+            hosts,
+            interval_s=interval_s,
+            timeout_ms=timeout_ms,
+            max_count=count,
+        )
 
     def _stop(self):
         self.host_manager.stop_all()
+        self._close_recorder()
         if self.test_active:
             self.test_active = False
             self._show_summary()
@@ -488,29 +604,120 @@ class MultiPingApp(tk.Tk):
             self.settings.host_descriptions = desc_map
 
             self.settings.save()
-            messagebox.showinfo("Saved", "Settings saved to config.json")
+            messagebox.showinfo("Saved", "Settings saved to config.json, hosts to inventory.db")
         except Exception as e:
             messagebox.showerror("Save failed", str(e))
 
+    def _import_hosts_json(self):
+        """Merge a config.json-style hosts file into the inventory and the current list."""
+        path = filedialog.askopenfilename(
+            title="Import Hosts JSON",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+        try:
+            inv = Inventory(self.settings.INVENTORY_PATH)
+            try:
+                read = inv.import_json(path)
+                # Only the imported hosts, by description; the rest of the inventory stays unloaded
+                with open(path, "r", encoding="utf-8") as f:
+                    wanted = set(json.load(f).get("hosts", []))
+                rows = [(h, d) for h, d in inv.load() if h in wanted]
+            finally:
+                inv.close()
+        except Exception as e:
+            messagebox.showerror("Import failed", str(e))
+            return
+        found = [(h, d) for h, d in rows if h not in self.stats]
+        count = int(self.count_var.get() or 60)
+        if found:
+            self.host_list.insert(tk.END, *(h for h, _ in found))
+            self.stats.update((h, HostStats(host=h, count=count, description=d)) for h, d in found)
+            self.targets = self.targets | TargetSet(h for h, _ in found)
+            self.settings.mark_stored(found)
+        self._refresh_table()
+        messagebox.showinfo("Imported", f"Read {read} hosts, added {len(found)} to the list.")
+
+    def _export_hosts_json(self):
+        path = filedialog.asksaveasfilename(
+            title="Export Hosts JSON",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            initialfile="zestyping_hosts.json",
+        )
+        if not path:
+            return
+        try:
+            inv = Inventory(self.settings.INVENTORY_PATH)
+            try:
+                inv.export_json(path)
+                n = len(inv)
+            finally:
+                inv.close()
+        except Exception as e:
+            messagebox.showerror("Export failed", str(e))
+            return
+        messagebox.showinfo("Exported", f"{n} saved hosts written to {path}")
+
+    def _close_recorder(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
     # ----- UI refresh loop -----
     def _ui_timer(self):
-        while True:
-            try:
-                s: PingSample = self.sample_queue.get_nowait()
-                if s.host not in self.stats:
-                    self.stats[s.host] = HostStats(host=s.host, count=int(self.count_var.get() or 60))
-                    self.host_list.insert(tk.END, s.host)
-                self.stats[s.host].add(s)
-            except Exception:
-                break
+        # One drain per tick hands over everything the workers produced since the last one
+        batch = self.sample_queue.drain()
+        stats = self.stats
+        corr = self.correlator
+        for s in batch:
+            st = stats.get(s.host)
+            if st is None:
+                st = stats[s.host] = HostStats(host=s.host, count=int(self.count_var.get() or 60))
+                self.host_list.insert(tk.END, s.host)
+                self.targets.add(s.host)
+            st.add(s)
+            corr.register(s.host, s.ip, st.description)
+            corr.add(s.host, s.ts, s.success)
+        if self.recorder is not None and batch:
+            self.recorder.extend(batch)
+        for ev in corr.poll():
+            ALERTS.post(Alert(ev.ts, ev.group, "correlated_outage", ev.message(), ev.down))
         self.host_manager.cleanup_finished()
         if self.test_active and not self.host_manager.running_hosts() and not self.summary_shown:
             self.test_active = False
+            self._close_recorder()
             self._show_summary()
         self._refresh_table()
         self._refresh_plot()
+        self._refresh_status()
+        self._refresh_alerts()
         self.after(500, self._ui_timer)
 
+    def _refresh_alerts(self):
+        # Newest first; detectors raised these while the batch above was added
+        for a in ALERTS.drain():
+            stamp = time.strftime("%H:%M:%S", time.localtime(a.ts))
+            self.alert_list.insert(0, f"{stamp}  {a.host}: {a.message}")
+        if self.alert_list.size() > MAX_ALERT_LINES:
+            self.alert_list.delete(MAX_ALERT_LINES, tk.END)
+
+    def _refresh_status(self):
+        tr = self.sample_queue.stats()
+        parts = [f"Samples: {tr['delivered']} delivered, {tr['dropped']} dropped"]
+        lim = self.host_manager.limiter_stats()
+        if lim is not None:
+            parts.append(
+                f"Rate limiter: {lim['probes']} probes, {lim['delayed']} delayed, "
+                f"lag avg {lim['mean_lag_ms']} ms / max {lim['max_lag_ms']} ms"
+            )
+        if self.history is not None:
+            hs = self.history.stats()
+            err = f", error: {self.history.error}" if self.history.error else ""
+            parts.append(f"History: {hs['written']} written, {hs['pending']} queued, {hs['dropped']} dropped{err}")
+        self.status_var.set("   |   ".join(parts))
+
     def _refresh_table(self):
         for r in self.table.get_children():
             self.table.delete(r)
@@ -519,6 +726,8 @@ class MultiPingApp(tk.Tk):
             ip = last.ip if last else ""
             sent, recv, loss = st.counts()
             mn, avg, mx = st.latency_stats()
+            p50, p95, p99 = st.percentiles()
+            jitter, _, score = st.voip()
             last_ms = last.latency_ms if last and last.success else None
             last_seen = time.strftime("%H:%M:%S", time.localtime(last.ts)) if last else ""
             desc = st.description or ""
@@ -537,6 +746,11 @@ class MultiPingApp(tk.Tk):
                     fmt(mn),
                     fmt(avg),
                     fmt(mx),
+                    fmt(p50),
+                    fmt(p95),
+                    fmt(p99),
+                    fmt(jitter),
+                    fmt(score),
                     f"{loss}",
                     f"{recv}",
                     f"{sent}",
@@ -555,9 +769,13 @@ class MultiPingApp(tk.Tk):
         # Format ticks as clock time
         self.ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M:%S"))
 
+        # Beyond the raw window, plot per-bucket means from the rollup tier that fits the range
+        back = PLOT_RANGES.get(self.plot_range.get())
+        t0 = None if not back else time.time() - back
+
         have_data = False
         for h, st in sorted(self.stats.items(), key=lambda kv: kv[0].lower()):
-            xs, ys = st.series()
+            xs, ys = st.series() if back is None else st.rollups.series(t0, max_points=PLOT_MAX_POINTS)
             if not xs:
                 continue
 
@@ -585,18 +803,36 @@ class MultiPingApp(tk.Tk):
             desc = st.description or ""
             mn, avg, mx = st.latency_stats()
             mean_sd, stdev = st.latency_sigma()  # <-- NEW
+            p50, p95, p99 = st.percentiles()
+            jitter, r_factor, score = st.voip()
+            run = st.rollups.summary()  # whole run, not just the window
 
             rows.append(
-                (h, desc, ip, sent, recv, loss, mn, avg, mx, stdev)
+                (h, desc, ip, sent, recv, loss, mn, avg, mx, stdev, p50, p95, p99, jitter, r_factor, score,
+                 run["sent"], run["loss_pct"], round(run["avg"]) if run["avg"] is not None else None)
+            )
+
+        # Outage events were recorded as samples arrived; nothing is rescanned here
+        outage_rows = sorted(
+            ((ev.start_ts, h, st.description or "", ev) for h, st in self.stats.items() for ev in st.outages.events),
+            key=lambda r: (r[0], r[1].lower()),
+        )
+
+        if len(rows) > 1:
+            # Fleet-wide percentiles come from merging the per-host sketches
+            fleet = merged(st.window.sketch for st in self.stats.values())
+            f50, f95, f99 = fleet.quantiles()
+            rows.append(
+                ("(all hosts)", "", "", sum(r[3] for r in rows), sum(r[4] for r in rows), "", None, None, None, None, f50, f95, f99, None, None, None, sum(r[16] for r in rows), "", None)
             )
 
         win = tk.Toplevel(self)
         win.title("Run Summary")
-        win.geometry("1080x720")
+        win.geometry("1640x760")
         win.transient(self)
         win.grab_set()
 
-        cols = ("Host", "Desc", "IP", "Sent", "Recv", "Loss%", "Min", "Avg", "Max", "StDev")
+        cols = ("Host", "Desc", "IP", "Sent", "Recv", "Loss%", "Min", "Avg", "Max", "StDev", "P50", "P95", "P99", "Jitter", "R", "MOS", "Run Sent", "Run Loss%", "Run Avg")
 
         tree = ttk.Treeview(win, columns=cols, show="headings")
         for c in cols:
@@ -609,10 +845,31 @@ class MultiPingApp(tk.Tk):
             tree.column(c, width=width, anchor=tk.CENTER)
         tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
 
+        out_frame = ttk.LabelFrame(win, text=f"Outages ({len(outage_rows)})")
+        out_frame.pack(fill=tk.X, padx=8, pady=(0, 8))
+        out_cols = ("Host", "Desc", "Start", "End", "Duration (s)", "Lost")
+        out_tree = ttk.Treeview(out_frame, columns=out_cols, show="headings", height=6)
+        for c in out_cols:
+            out_tree.heading(c, text=c)
+            out_tree.column(c, width=140 if c in ("Host", "Desc") else 110, anchor=tk.CENTER)
+        out_tree.pack(fill=tk.X, padx=6, pady=6)
+
+        now = time.time()
+
+        def clock(ts):
+            return time.strftime("%H:%M:%S", time.localtime(ts))
+
+        def outage_values(h, desc, ev):
+            end = clock(ev.end_ts) if ev.end_ts is not None else "ongoing"
+            return (h, desc, clock(ev.start_ts), end, round(ev.duration_s(now), 1), ev.lost)
+
+        for _, h, desc, ev in outage_rows:
+            out_tree.insert("", tk.END, values=outage_values(h, desc, ev))
+
         def fmt(v):
             return "" if v is None else str(v)
 
-        for (h, desc, ip, sent, recv, loss, mn, avg, mx, stdev) in rows:
+        for (h, desc, ip, sent, recv, loss, mn, avg, mx, stdev, p50, p95, p99, jitter, r_factor, score, run_sent, run_loss, run_avg) in rows:
             tree.insert(
         "",
         tk.END,
@@ -626,7 +883,16 @@ class MultiPingApp(tk.Tk):
             fmt(mn),
             fmt(avg),
             fmt(mx),
-            fmt(round(stdev, 2) if stdev is not None else "")
+            fmt(round(stdev, 2) if stdev is not None else ""),
+            fmt(p50),
+            fmt(p95),
+            fmt(p99),
+            fmt(jitter),
+            fmt(r_factor),
+            fmt(score),
+            run_sent,
+            run_loss,
+            fmt(run_avg),
         ),
     )
 
@@ -648,12 +914,26 @@ class MultiPingApp(tk.Tk):
                     fmt(mn),
                     fmt(avg),
                     fmt(mx),
-                    fmt(round(stdev, 2) if stdev is not None else "")
+                    fmt(round(stdev, 2) if stdev is not None else ""),
+                    fmt(p50),
+                    fmt(p95),
+                    fmt(p99),
+                    fmt(jitter),
+                    fmt(r_factor),
+                    fmt(score),
+                    str(run_sent),
+                    str(run_loss),
+                    fmt(run_avg),
                 ]
             )
-            for (h, desc, ip, sent, recv, loss, mn, avg, mx, stdev) in rows
+            for (h, desc, ip, sent, recv, loss, mn, avg, mx, stdev, p50, p95, p99, jitter, r_factor, score, run_sent, run_loss, run_avg) in rows
         ]
 
+            if outage_rows:
+                tsv_rows += ["", "\t".join(out_cols)] + [
+                    "\t".join(str(v) for v in outage_values(h, desc, ev)) for _, h, desc, ev in outage_rows
+                ]
+
             self.clipboard_clear()
             self.clipboard_append("\n".join(tsv_rows))
             self.update()
@@ -720,5 +1000,6 @@ class MultiPingApp(tk.Tk):
     def _on_close(self):
         try:
             self.host_manager.stop_all()
+            self._close_recorder()
         finally:
             self.destroy()
@@ -1,26 +1,89 @@
-
 import subprocess, sys, re, math
 WIN = sys.platform.startswith('win')
 WIN_RE_FULL = re.compile(r"Reply from\s+([\d\.:a-fA-F]+):.*time[=<]?\s*(\d+)\s*ms.*TTL[=\s]?\s*(\d+)", re.IGNORECASE)
 WIN_RE_TIME = re.compile(r"Reply from\s+([\d\.:a-fA-F]+):.*time[=<]?\s*(\d+)\s*ms", re.IGNORECASE)
-POSIX_RE = re.compile(r"bytes from\s+([\d\.:a-fA-F]+).*time[=\s]\s*([\d\.]+)\s*ms.*ttl[=\s]\s*(\d+)", re.IGNORECASE)
-POSIX_RE_TIME = re.compile(r"bytes from\s+([\d\.:a-fA-F]+).*time[=\s]\s*([\d\.]+)\s*ms", re.IGNORECASE)
+# Linux/macOS print ttl before time and may show "name (ip)", so the ttl is matched by lookahead.
+# Link-local replies carry the zone ("fe80::1%eth0"), which stays part of the ip.
+POSIX_RE = re.compile(r"bytes from\s+(?:\S+\s+\()?(?P<ip>[\d\.:a-fA-F]+?(?:%[\w.-]+)?)\)?:?\s(?=.*ttl[=\s]\s*(?P<ttl>\d+)).*time[=\s]\s*(?P<ms>[\d\.]+)\s*ms", re.IGNORECASE)
+POSIX_RE_TIME = re.compile(r"bytes from\s+(?:\S+\s+\()?(?P<ip>[\d\.:a-fA-F]+?(?:%[\w.-]+)?)\)?:?\s.*time[=\s]\s*(?P<ms>[\d\.]+)\s*ms", re.IGNORECASE)
+ICMP_SEQ_RE = re.compile(r"icmp_seq[=\s]\s*(\d+)", re.IGNORECASE)
+NO_ANSWER_RE = re.compile(r"no answer yet for icmp_seq=(\d+)", re.IGNORECASE)
+WIN_LOSS_RE = re.compile(r"Request timed out|unreachable|General failure|TTL expired", re.IGNORECASE)
+FAILURE = {"success": False, "latency_ms": None, "ip": None, "ttl": None}
+def ping_command(host: str, timeout_ms: int = 1000):
+    if WIN: return ["ping", "-n", "1", "-w", str(timeout_ms), host]
+    return ["ping", "-c", "1", "-W", str(max(1, math.ceil(timeout_ms/1000))), host]
+def parse_ping_line(line: str):
+    """Parse one line of ping output; returns a success result dict, or None if the line is not a reply."""
+    if WIN:
+        m=WIN_RE_FULL.search(line)
+        if m: return {"success": True,"latency_ms":int(m.group(2)),"ip":m.group(1),"ttl":int(m.group(3))}
+        m2=WIN_RE_TIME.search(line)
+        if m2: return {"success": True,"latency_ms":int(m2.group(2)),"ip":m2.group(1),"ttl":None}
+        return None
+    m=POSIX_RE.search(line)
+    if m: return {"success": True,"latency_ms":float(m.group("ms")),"ip":m.group("ip"),"ttl":int(m.group("ttl"))}
+    m2=POSIX_RE_TIME.search(line)
+    if m2: return {"success": True,"latency_ms":float(m2.group("ms")),"ip":m2.group("ip"),"ttl":None}
+    return None
+def parse_ping_output(out: str):
+    for line in out.splitlines():
+        res=parse_ping_line(line)
+        if res: return res
+    return dict(FAILURE)
 def ping_host(host: str, timeout_ms: int = 1000):
-    if WIN: cmd = ["ping", "-n", "1", "-w", str(timeout_ms), host]
-    else: cmd = ["ping", "-c", "1", "-W", str(max(1, math.ceil(timeout_ms/1000))), host]
     try:
-        cp = subprocess.run(cmd, capture_output=True, text=True, timeout=(timeout_ms/1000 + 2)); out = cp.stdout
-    except Exception: return {"success": False, "latency_ms": None, "ip": None, "ttl": None}
+        cp = subprocess.run(ping_command(host, timeout_ms), capture_output=True, text=True, timeout=(timeout_ms/1000 + 2)); out = cp.stdout
+    except Exception: return dict(FAILURE)
+    return parse_ping_output(out)
+def stream_command(host: str, interval_s: float, timeout_ms: int, count=None):
+    """Command line for one long-lived ping that probes every interval_s (Windows ping is fixed at 1 s)."""
+    if WIN: return ["ping", "-t", "-w", str(timeout_ms), host] if count is None else ["ping", "-n", str(count), "-w", str(timeout_ms), host]
+    cmd = ["ping", "-i", f"{interval_s:g}", "-W", str(max(1, math.ceil(timeout_ms/1000)))]
+    if sys.platform.startswith("linux"): cmd.append("-O")  # report "no answer yet" so losses show up in-stream
+    if count is not None: cmd += ["-c", str(count)]
+    return cmd + [host]
+# First icmp_seq printed by the system ping (iputils starts at 1, BSD/macOS at 0)
+STREAM_SEQ_BASE = 1 if sys.platform.startswith("linux") else 0
+def parse_stream_line(line: str):
+    """
+    Parse one line of streaming ping output.
+    Returns (icmp_seq or None, result dict) for replies and losses, or None for anything else.
+    """
     if WIN:
-        for line in out.splitlines():
-            m=WIN_RE_FULL.search(line)
-            if m: ip,lat,ttl=m.group(1),int(m.group(2)),int(m.group(3)); return {"success": True,"latency_ms":lat,"ip":ip,"ttl":ttl}
-            m2=WIN_RE_TIME.search(line)
-            if m2: ip,lat=m2.group(1),int(m2.group(2)); return {"success": True,"latency_ms":lat,"ip":ip,"ttl":None}
-        return {"success": False, "latency_ms": None, "ip": None, "ttl": None}
-    for line in out.splitlines():
-        m=POSIX_RE.search(line)
-        if m: ip,lat,ttl=m.group(1),float(m.group(2)),int(m.group(3)); return {"success": True,"latency_ms":lat,"ip":ip,"ttl":ttl}
-        m2=POSIX_RE_TIME.search(line)
-        if m2: ip,lat=m2.group(1),float(m.group(2)); return {"success": True,"latency_ms":lat,"ip":ip,"ttl":None}
-    return {"success": False, "latency_ms": None, "ip": None, "ttl": None}
+        if WIN_LOSS_RE.search(line): return None, dict(FAILURE)
+        res=parse_ping_line(line)
+        return (None, res) if res else None
+    m=NO_ANSWER_RE.search(line)
+    if m: return int(m.group(1)), dict(FAILURE)
+    res=parse_ping_line(line)
+    if not res: return None
+    m=ICMP_SEQ_RE.search(line)
+    return (int(m.group(1)) if m else None), res
+ENGINES = ("subprocess", "icmp", "stream")
+def make_pinger(engine: str = "subprocess"):
+    """Return a ping(host, timeout_ms) callable for the named engine; "icmp" falls back to subprocess if no ICMP socket can be opened."""
+    if engine == "icmp":
+        import icmp
+        if icmp.available(): return icmp.IcmpProber().ping
+    return ping_host
+# Reply lines the POSIX parsers must understand: (line, ip, ttl, ms); run `python utils.py` to check them
+POSIX_SAMPLES = (
+    ("64 bytes from 8.8.8.8: icmp_seq=1 ttl=117 time=12.3 ms", "8.8.8.8", 117, 12.3),
+    ("64 bytes from dns.google (8.8.8.8): icmp_seq=1 ttl=117 time=12.3 ms", "8.8.8.8", 117, 12.3),
+    ("64 bytes from 127.0.0.1: icmp_seq=0 ttl=64 time=0.045 ms", "127.0.0.1", 64, 0.045),
+    ("64 bytes from ::1: icmp_seq=1 ttl=64 time=0.031 ms", "::1", 64, 0.031),
+    ("64 bytes from localhost (::1): icmp_seq=1 ttl=64 time=0.031 ms", "::1", 64, 0.031),
+    ("64 bytes from fe80::1%eth0: icmp_seq=1 ttl=64 time=0.045 ms", "fe80::1%eth0", 64, 0.045),
+    ("64 bytes from 2001:db8::1: icmp_seq=3 ttl=55 time=1 ms", "2001:db8::1", 55, 1.0),
+    ("16 bytes from 10.0.0.1: icmp_seq=3 time=1.5 ms", "10.0.0.1", None, 1.5),
+)
+if __name__ == "__main__":
+    for line, ip, ttl, ms in POSIX_SAMPLES:
+        m = POSIX_RE.search(line)
+        got = (m.group("ip"), int(m.group("ttl")), float(m.group("ms"))) if m else None
+        if got is None:
+            m = POSIX_RE_TIME.search(line)
+            got = (m.group("ip"), None, float(m.group("ms"))) if m else None
+        assert got == (ip, ttl, ms), (line, got)
+    print(f"{len(POSIX_SAMPLES)} reply lines parsed")